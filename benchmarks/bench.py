@@ -0,0 +1,291 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from data import fetch_fundamental_data_yahoo, get_summary_tables_from_prices
+from price_matrix import PriceMatrix
+from providers import FixtureProvider
+from risk import RiskEngine
+from screener import SAVED_SCREENS, Screener
+from sectors import SectorAggregates
+from style_and_plot import (SHORT_COLUMNS,
+                            create_tree_map,
+                            plot_multiple_symbols,
+                            plot_single_symbol,
+                            style_dataframe)
+
+"""
+benchmarks/bench.py
+
+Offline benchmarks of the dashboard's hot paths on synthetic universes.
+Each scale is a number of tickers and years of daily history; prices are
+seeded random walks (some tickers listed mid-window, a tenth of them crypto
+on a 7-day calendar) and fundamentals come from `FixtureProvider` through
+the same formatting code as the live pipeline.
+
+Every case reports the best wall time over a few repeats, the peak memory
+allocated during one run (tracemalloc) and, for figures, the size of the
+JSON payload sent to the browser. Results are compared with a stored
+baseline and the run fails when a case regresses beyond the tolerance.
+Run from the repository root:
+
+    python -m benchmarks.bench                      # compare with baseline.json
+    python -m benchmarks.bench --tickers 5000 --years 30
+    python -m benchmarks.bench --update-baseline    # record a new baseline
+
+Wall times depend on the machine: record the baseline on the machine that
+runs the comparison.
+"""
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+# (tickers, years) benchmarked by default
+DEFAULT_SCALES = ((100, 1), (1000, 10), (5000, 30))
+
+# Allowed relative increase before a metric counts as a regression
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.2
+PAYLOAD_TOLERANCE = 0.05
+
+# Wall times below this are too noisy to compare
+MIN_SECONDS = 0.005
+
+# Last date of the synthetic history, fixed so payloads are reproducible
+END_DATE = "2025-06-30"
+
+CRYPTO_SHARE = 0.1
+
+
+def synthetic_universe(n_tickers, years, seed=0):
+    """
+    Synthetic prices and fundamentals at a given scale.
+
+    Args:
+        n_tickers (int): Tickers in the universe, a tenth of them crypto.
+        years (int): Years of daily history.
+        seed (int): Random seed.
+
+    Returns:
+        dict: 'equity' and 'crypto' price frames (dates x tickers) and the
+            'fundamentals' frame, indexed by ticker.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(END_DATE)
+    start = end - pd.DateOffset(years=years)
+    n_crypto = max(int(n_tickers * CRYPTO_SHARE), 1)
+    tickers = {
+        "equity": ["SPY", "QQQ"] + [f"SYN{i:05d}" for i in range(n_tickers - n_crypto - 2)],
+        "crypto": [f"C{i:04d}-USD" for i in range(n_crypto)],
+    }
+    calendars = {"equity": pd.bdate_range(start, end), "crypto": pd.date_range(start, end)}
+    frames = {}
+    for name, names in tickers.items():
+        dates = calendars[name]
+        log_returns = rng.normal(0.0003, 0.02, (len(dates), len(names)))
+        values = rng.uniform(10, 500, len(names)) * np.exp(np.cumsum(log_returns, axis=0))
+        # A fifth of the tickers are listed during the window
+        listed = rng.random(len(names)) < 0.2
+        first = rng.integers(0, len(dates), len(names))
+        values[np.arange(len(dates))[:, None] < np.where(listed, first, 0)] = np.nan
+        frames[name] = pd.DataFrame(values, index=dates, columns=names)
+
+    fundamentals = fetch_fundamental_data_yahoo(
+        FixtureProvider(end=END_DATE), tickers["equity"] + tickers["crypto"],
+        crypto_tickers=tickers["crypto"], etf_tickers=["SPY", "QQQ"],
+        rate=1e6, deadline=None)
+    frames["fundamentals"] = pd.DataFrame.from_dict(fundamentals, orient="index")
+    return frames
+
+
+def _payload(fig):
+    return len(fig.to_json())
+
+
+def cases(universe):
+    """
+    Benchmark cases over one universe.
+
+    Inputs a case does not time (e.g. the summary a chart is drawn from) are
+    built once here.
+
+    Returns:
+        dict: name -> callable returning the figure to measure, or None.
+    """
+    equity, crypto = universe["equity"], universe["crypto"]
+    fundamentals = universe["fundamentals"]
+    summary = pd.concat([get_summary_tables_from_prices(equity, fundamentals),
+                         get_summary_tables_from_prices(crypto, fundamentals)])
+    prices = PriceMatrix.from_frames({"equity": equity, "crypto": crypto})
+    # Risk columns are used by saved screens
+    summary = summary.join(RiskEngine().update(prices)[0])
+    sectors = SectorAggregates.compute(summary)
+    sector = sectors.sectors[0]
+    sector_symbols = sectors.members[sector][:10]
+    symbol = sector_symbols[0]
+
+    def summary_tables():
+        pd.concat([get_summary_tables_from_prices(equity, fundamentals),
+                   get_summary_tables_from_prices(crypto, fundamentals)])
+
+    def screens():
+        # A new screener per run: column indexes are built cold, as on a new snapshot
+        screener = Screener(summary)
+        for query in SAVED_SCREENS.values():
+            screener.run(query)
+
+    def style():
+        # What Streamlit does with a Styler before serializing it
+        style_dataframe(summary[SHORT_COLUMNS])._compute()
+
+    return {
+        "summary_tables": summary_tables,
+        "price_matrix": lambda: PriceMatrix.from_frames({"equity": equity, "crypto": crypto}),
+        "price_frame_mixed": lambda: prices.frame(prices.tickers),
+        "tree_map": lambda: create_tree_map(summary, sectors),
+        "style_dataframe": style,
+        "screener": screens,
+        "plot_multiple_symbols": lambda: plot_multiple_symbols(prices[sector_symbols]),
+        "plot_single_symbol": lambda: plot_single_symbol(prices[[symbol]], panel="rsi_14"),
+    }
+
+
+def measure(fn, repeat=3):
+    """
+    Best wall time, peak traced memory and figure payload of `fn`.
+
+    Returns:
+        dict: seconds, peak_bytes and payload_bytes (None unless `fn`
+            returns a figure).
+    """
+    result = fn()  # warm-up
+    payload = _payload(result) if hasattr(result, "to_plotly_json") else None
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak, "payload_bytes": payload}
+
+
+def run(scales, repeat=3, only=None):
+    """
+    Benchmark every case at every scale.
+
+    Args:
+        scales (list): (tickers, years) pairs.
+        repeat (int): Timed runs per case.
+        only (list): Case names to run, all when None.
+
+    Returns:
+        dict: '<tickers>x<years>y' -> case name -> measurements.
+    """
+    results = {}
+    for n_tickers, years in scales:
+        scale = f"{n_tickers}x{years}y"
+        universe = synthetic_universe(n_tickers, years)
+        results[scale] = {}
+        for name, fn in cases(universe).items():
+            if only and name not in only:
+                continue
+            results[scale][name] = m = measure(fn, repeat)
+            payload = "" if m["payload_bytes"] is None else f"{m['payload_bytes'] / 1e3:10.1f} kB"
+            print(f"{scale:<10} {name:<22} {m['seconds'] * 1e3:10.1f} ms "
+                  f"{m['peak_bytes'] / 1e6:10.1f} MB {payload}", flush=True)
+    return results
+
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE,
+            memory_tolerance=MEMORY_TOLERANCE, payload_tolerance=PAYLOAD_TOLERANCE):
+    """
+    Regressions of `results` against `baseline`.
+
+    Cases or scales missing from the baseline are not compared.
+
+    Returns:
+        list[str]: One message per regressed metric.
+    """
+    tolerances = {"seconds": time_tolerance, "peak_bytes": memory_tolerance,
+                  "payload_bytes": payload_tolerance}
+    regressions = []
+    for scale, scale_results in results.items():
+        for name, measured in scale_results.items():
+            reference = baseline.get(scale, {}).get(name)
+            if reference is None:
+                continue
+            for metric, tolerance in tolerances.items():
+                new, old = measured.get(metric), reference.get(metric)
+                if new is None or not old:
+                    continue
+                if metric == "seconds" and max(new, old) < MIN_SECONDS:
+                    continue
+                if new > old * (1 + tolerance):
+                    regressions.append(f"{scale} {name} {metric}: {new:.6g} vs baseline "
+                                       f"{old:.6g} (+{new / old - 1:.0%}, tolerance {tolerance:.0%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's hot paths.")
+    parser.add_argument("--tickers", type=int, nargs="+",
+                        help="Universe sizes, combined with --years (default: built-in scales).")
+    parser.add_argument("--years", type=int, nargs="+", default=[10],
+                        help="Years of history for each --tickers size.")
+    parser.add_argument("--case", nargs="+", help="Only run these cases.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write the results to the baseline instead of comparing.")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scales = DEFAULT_SCALES if not args.tickers else \
+        [(n, years) for n in args.tickers for years in args.years]
+    results = run(scales, args.repeat, args.case)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.pop("_environment", None)
+        for scale, scale_results in results.items():
+            baseline.setdefault(scale, {}).update(scale_results)
+        baseline = {"_environment": {"python": platform.python_version(),
+                                     "machine": platform.machine(),
+                                     "numpy": np.__version__, "pandas": pd.__version__},
+                    **baseline}
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --update-baseline first")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text()),
+                          args.time_tolerance, args.memory_tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if regressions:
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+"""
+build_snapshot_cli.py
+
+Command-line entry point building one market snapshot and publishing it to
+the snapshot directory read by the dashboard, e.g. from cron:
+
+    */30 * * * * cd /srv/yfh && YFH_APP_REFRESH=0 python build_snapshot_cli.py
+
+Progress of every pipeline stage is printed to stderr. The exit status is 0
+on success, 1 if the build failed and nothing was published, and 2 if the
+snapshot was published but some tickers could not be refreshed (unless
+--allow-partial is given).
+"""
+
+EXIT_OK, EXIT_FAILED, EXIT_PARTIAL = 0, 1, 2
+
+
+def _print_progress(event, fields):
+    """Render pipeline events as one human-readable line each."""
+    if event == "stage":
+        extra = " ".join(f"{k}={v}" for k, v in fields.items()
+                         if k not in ("stage", "seconds", "outcome"))
+        status = "" if fields.get("outcome") == "ok" else f" [{fields.get('outcome')}]"
+        print(f"{fields['stage']:<18} {fields['seconds']:8.2f}s{status} {extra}".rstrip(),
+              file=sys.stderr, flush=True)
+    elif event == "snapshot_published":
+        print(f"published snapshot {fields['version']}", file=sys.stderr, flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build a market snapshot and publish it for the dashboard.")
+    parser.add_argument("--data-dir",
+                        help="Data directory (price store, snapshots), overrides YFH_DATA_DIR.")
+    parser.add_argument("--provider", choices=("yahoo", "fixture"),
+                        help="Market-data provider, overrides YFH_PROVIDER.")
+    parser.add_argument("--json", action="store_true",
+                        help="Log progress as JSON lines instead of text.")
+    parser.add_argument("--allow-partial", action="store_true",
+                        help="Exit 0 even if some tickers could not be refreshed.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Debug logging.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Build and publish one snapshot.
+
+    Args:
+        argv (list): Command-line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit status.
+    """
+    args = parse_args(argv)
+    # Configuration is read from the environment when the modules are imported
+    if args.data_dir:
+        os.environ["YFH_DATA_DIR"] = args.data_dir
+    if args.provider:
+        os.environ["YFH_PROVIDER"] = args.provider
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    import metrics
+    from data import build_snapshot
+    from snapshot_store import SNAPSHOT_DIR, write_snapshot
+
+    if args.json:
+        metrics.configure_event_logging()
+    else:
+        metrics.add_listener(_print_progress)
+
+    started = time.monotonic()
+    try:
+        snapshot = build_snapshot()
+        version = write_snapshot(snapshot, SNAPSHOT_DIR)
+    except Exception:
+        logging.exception("Snapshot build failed")
+        return EXIT_FAILED
+    metrics.log_event("snapshot_published", version=version, pid=os.getpid())
+    metrics.export()
+
+    missing = {kind: sorted(set(tickers)) for kind, tickers in (snapshot.missing or {}).items()
+               if tickers}
+    if args.json:
+        metrics.log_event("build_summary", version=version, tickers=len(snapshot.summary),
+                          seconds=round(time.monotonic() - started, 3), missing=missing)
+    else:
+        print(f"{len(snapshot.summary)} tickers in {time.monotonic() - started:.1f}s",
+              file=sys.stderr)
+        for kind, tickers in missing.items():
+            print(f"missing {kind} ({len(tickers)}): {' '.join(tickers)}", file=sys.stderr)
+    if missing and not args.allow_partial:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,95 +1,151 @@
-from concurrent.futures import ThreadPoolExecutor
 import logging
 import datetime
 import pandas as pd
-import streamlit as st
-import yfinance as yf
-from yahooquery import Screener
+from fetcher import fetch_all
+from fundamentals_cache import FundamentalsCache
+from history import download_history
+from indicators import IndicatorCube
+from metrics import REGISTRY, span
+from price_matrix import PriceMatrix
+from price_store import PriceStore
+from providers import get_provider
+from returns import DEFAULT_HORIZONS, ReturnEngine
+from risk import RiskEngine
+from sectors import SectorAggregates
+from snapshot_store import SNAPSHOT_DIR, Snapshot, read_manifest
 
 """
 data.py
 
 This module processes data for the screening dashboard, including fetching 
 crypto and ETF tickers and handling related computations and error handling.
+It has no Streamlit dependency and no import-time side effects, so it can be
+used as a library and from the `build_snapshot_cli` command line.
 """
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-
-# Set global float format to display 2 decimal places
-pd.options.display.float_format = '{:.2f}'.format
-
+# S&P 500 constituents (all share classes), as of late 2025. Membership changes are
+# applied by hand: delisted or acquired names would be re-requested from
+# START_DATE on every refresh and reported as missing
 sp500_tickers = [
-    "AAPL", "MSFT", "GOOG", "AMZN", "META", "BRK-B", "JNJ", "V", "NVDA", "WMT",
-    "TSLA", "JPM", "PG", "UNH", "HD", "DIS", "PYPL", "MA", "ADBE", "CMCSA",
-    "NFLX", "VZ", "KO", "PFE", "PEP", "T", "MRK", "CSCO", "INTC", "XOM",
-    "BAC", "ABT", "CVX", "ORCL", "ACN", "CRM", "ABBV", "NKE", "LLY", "COST",
-    "TMO", "DHR", "MCD", "MDT", "NEE", "TXN", "PM", "WFC", "BMY", "LIN",
-    "RTX", "UNP", "HON", "LOW", "QCOM", "IBM", "INTU", "SBUX", "CAT", "AMGN",
-    "GS", "BLK", "DE", "CHTR", "ISRG", "ADP", "AMD", "BKNG", "PLD", "AXP",
-    "NOW", "SPGI", "CI", "ZTS", "GE", "AMAT", "SYK", "MMM", "TGT", "CB",
-    "LMT", "ADI", "EL", "MO", "AMT", "BA", "FIS", "GILD", "SCHW", "MS", "C",
-    # "ETN", "MU", "MDLZ", "USB", "VRTX", "TJX", "PNC", "APD", "CCI", "SHW",
-    # "FDX", "KLAC", "WM", "SO", "NSC", "PGR", "EQIX", "DUK", "ICE", "REGN",
-    # "PSA", "ITW", "ECL", "ADM", "BDX", "TRV", "HUM", "AON", "COF", "MRNA",
-    # "EW", "ATVI", "MCO", "ADSK", "CSX", "MAR", "CMG", "HCA", "ROP", "CTSH",
-    # "PRU", "KMB", "AEP", "VRSK", "AZO", "BIIB", "ORLY", "IDXX", "ROST",
-    # "CME", "STZ", "A", "FTNT", "PAYX", "SLB", "APH", "MSI", "XEL", "BK",
-    # "KMI", "ILMN", "D", "HLT", "MCHP", "MPC", "DXCM", "WTW", "DOW", "EBAY",
-    # "WBA", "SPG", "SYY", "HPQ", "NEM", "GPN", "ALL", "PXD", "DD", "CNC",
-    # "IQV", "LRCX", "TFC", "MET", "PSX", "PPG", "ALB", "NOC", "EA", "DAL",
-    # "FAST", "RSG", "PH", "DFS", "TEL", "F", "WMB", "NTRS", "ZBH", "BAX",
-    # "VLO", "HES", "KR", "PCAR", "CHD", "MTD", "CF", "KEYS", "LEN", "EQR",
-    # "OXY", "EXC", "EIX", "BKR", "FE", "ESS", "HIG", "WEC", "ATO", "DTE",
-    # "ETR", "PEG", "CMS", "AES", "LHX", "NDAQ", "IRM", "HOLX", "SBAC", "XYL",
-    # "DLTR", "MKC", "TSN", "DRI", "LUV", "STT", "FITB", "HBAN", "AFL", "AIG",
-    # "DHI", "CAG", "CHRW", "EXPE", "VTR", "PPL", "MTB", "NVR", "RMD", "HII",
-    # "COO", "CARR", "HSIC", "IPG", "VFC", "ZBRA", "PKI", "XRAY", "CPRT",
-    # "TRGP", "FDS", "ZION", "NRG", "FRC", "APA", "VIAC", "GNRC", "AKAM",
-    # "CNP", "DVA", "SIVB", "NI", "WYNN", "UAL", "PNR", "NWL", "K", "ETFC",
-    # "BXP", "WRK", "WHR", "AAP", "HPE", "SEE", "NLSN", "RL", "MOS", "LYB",
-    # "LUMN", "IP", "FTI", "DXC", "ALK", "LEG", "UHS", "CFX", "BBWI", "NWSA",
-    # "DISCK", "KIM", "HAS", "NLOK", "VIAC"
+    "A", "AAPL", "ABBV", "ABNB", "ABT", "ACGL", "ACN", "ADBE", "ADI", "ADM",
+    "ADP", "ADSK", "AEE", "AEP", "AES", "AFL", "AIG", "AIZ", "AJG", "AKAM",
+    "ALB", "ALGN", "ALL", "ALLE", "AMAT", "AMCR", "AMD", "AME", "AMGN",
+    "AMP", "AMT", "AMZN", "ANET", "AON", "AOS", "APA", "APD", "APH", "APO",
+    "APP", "APTV", "ARE", "ATO", "AVB", "AVGO", "AVY", "AWK", "AXON", "AXP",
+    "AZO", "BA", "BAC", "BALL", "BAX", "BBY", "BDX", "BEN", "BF-B", "BG",
+    "BIIB", "BK", "BKNG", "BKR", "BLDR", "BLK", "BMY", "BR", "BRK-B", "BRO",
+    "BSX", "BX", "BXP", "C", "CAG", "CAH", "CARR", "CAT", "CB", "CBOE",
+    "CBRE", "CCI", "CCL", "CDNS", "CDW", "CEG", "CF", "CFG", "CHD", "CHRW",
+    "CHTR", "CI", "CINF", "CL", "CLX", "CMCSA", "CME", "CMG", "CMI", "CMS",
+    "CNC", "CNP", "COF", "COIN", "COO", "COP", "COR", "COST", "CPAY", "CPB",
+    "CPRT", "CPT", "CRL", "CRM", "CRWD", "CSCO", "CSGP", "CSX", "CTAS",
+    "CTRA", "CTSH", "CTVA", "CVS", "CVX", "D", "DAL", "DASH", "DAY", "DD",
+    "DDOG", "DE", "DECK", "DELL", "DG", "DGX", "DHI", "DHR", "DIS", "DLR",
+    "DLTR", "DOC", "DOV", "DOW", "DPZ", "DRI", "DTE", "DUK", "DVA", "DVN",
+    "DXCM", "EA", "EBAY", "ECL", "ED", "EFX", "EG", "EIX", "EL", "ELV",
+    "EME", "EMN", "EMR", "EOG", "EPAM", "EQIX", "EQR", "EQT", "ERIE", "ES",
+    "ESS", "ETN", "ETR", "EVRG", "EW", "EXC", "EXE", "EXPD", "EXPE", "EXR",
+    "F", "FANG", "FAST", "FCX", "FDS", "FDX", "FE", "FFIV", "FI", "FICO",
+    "FIS", "FITB", "FOX", "FOXA", "FRT", "FSLR", "FTNT", "FTV", "GD",
+    "GDDY", "GE", "GEHC", "GEN", "GEV", "GILD", "GIS", "GL", "GLW", "GM",
+    "GNRC", "GOOG", "GOOGL", "GPC", "GPN", "GRMN", "GS", "GWW", "HAL",
+    "HAS", "HBAN", "HCA", "HD", "HIG", "HII", "HLT", "HOLX", "HON", "HOOD",
+    "HPE", "HPQ", "HRL", "HSIC", "HST", "HSY", "HUBB", "HUM", "HWM", "IBKR",
+    "IBM", "ICE", "IDXX", "IEX", "IFF", "INCY", "INTC", "INTU", "INVH",
+    "IP", "IQV", "IR", "IRM", "ISRG", "IT", "ITW", "IVZ", "J", "JBHT",
+    "JBL", "JCI", "JKHY", "JNJ", "JPM", "KDP", "KEY", "KEYS", "KHC", "KIM",
+    "KKR", "KLAC", "KMB", "KMI", "KMX", "KO", "KR", "KVUE", "L", "LDOS",
+    "LEN", "LH", "LHX", "LII", "LIN", "LKQ", "LLY", "LMT", "LNT", "LOW",
+    "LRCX", "LULU", "LUV", "LVS", "LW", "LYB", "LYV", "MA", "MAA", "MAR",
+    "MAS", "MCD", "MCHP", "MCK", "MCO", "MDLZ", "MDT", "MET", "META", "MGM",
+    "MHK", "MKC", "MLM", "MMC", "MMM", "MNST", "MO", "MOH", "MOS", "MPC",
+    "MPWR", "MRK", "MRNA", "MS", "MSCI", "MSFT", "MSI", "MTB", "MTCH",
+    "MTD", "MU", "NCLH", "NDAQ", "NDSN", "NEE", "NEM", "NFLX", "NI", "NKE",
+    "NOC", "NOW", "NRG", "NSC", "NTAP", "NTRS", "NUE", "NVDA", "NVR", "NWS",
+    "NWSA", "NXPI", "O", "ODFL", "OKE", "OMC", "ON", "ORCL", "ORLY", "OTIS",
+    "OXY", "PANW", "PAYC", "PAYX", "PCAR", "PCG", "PEG", "PEP", "PFE",
+    "PFG", "PG", "PGR", "PH", "PHM", "PKG", "PLD", "PLTR", "PM", "PNC",
+    "PNR", "PNW", "PODD", "POOL", "PPG", "PPL", "PRU", "PSA", "PSKY", "PSX",
+    "PTC", "PWR", "PYPL", "QCOM", "RCL", "REG", "REGN", "RF", "RJF", "RL",
+    "RMD", "ROK", "ROL", "ROP", "ROST", "RSG", "RTX", "RVTY", "SBAC",
+    "SBUX", "SCHW", "SHW", "SJM", "SLB", "SMCI", "SNA", "SNPS", "SO",
+    "SOLV", "SPG", "SPGI", "SRE", "STE", "STLD", "STT", "STX", "STZ", "SW",
+    "SWK", "SWKS", "SYF", "SYK", "SYY", "T", "TAP", "TDG", "TDY", "TECH",
+    "TEL", "TER", "TFC", "TGT", "TJX", "TKO", "TMO", "TMUS", "TPL", "TPR",
+    "TRGP", "TRMB", "TROW", "TRV", "TSCO", "TSLA", "TSN", "TT", "TTD",
+    "TTWO", "TXN", "TXT", "TYL", "UAL", "UBER", "UDR", "UHS", "ULTA", "UNH",
+    "UNP", "UPS", "URI", "USB", "V", "VICI", "VLO", "VLTO", "VMC", "VRSK",
+    "VRSN", "VRTX", "VST", "VTR", "VTRS", "VZ", "WAB", "WAT", "WBD", "WDAY",
+    "WDC", "WEC", "WELL", "WFC", "WM", "WMB", "WMT", "WRB", "WSM", "WST",
+    "WTW", "WY", "WYNN", "XEL", "XOM", "XYL", "XYZ", "YUM", "ZBH", "ZBRA",
+    "ZTS"
 ]
 
 etf_tickers = ["SPY", "QQQ", "DIA", "IWM"]  # Example ETFs
 crypto_tickers = ["BTC-USD", "ETH-USD","XRP-USD","SOL-USD","BNB-USD",
                   "DOGE-USD","ADA-USD","TRX-USD","LINK-USD","AVAX-USD"]
 
-def fetch_most_active_tickers():
+# First date of price history
+START_DATE = "2010-01-01"
+
+# Fundamentals persist across hourly refreshes, each field group on its own TTL
+fundamentals_cache = FundamentalsCache()
+# Risk state carried from build to build; a new process resumes from the last snapshot's
+risk_engine = RiskEngine()
+
+def fetch_most_active_tickers(provider):
     """
     Fetch the most active stock tickers from the 'most_actives' screener.
     
-    This function uses the Screener class to retrieve the 50 most active stock tickers
-    based on trading activity. It extracts the symbols from the returned data
-    and returns them as a list.
+    This function asks the market-data provider for the 50 most active stock
+    tickers based on trading activity and returns their symbols as a list.
+
+    Args:
+        provider (MarketDataProvider): Market-data backend.
     
     Returns:
         list: A list of strings representing the stock tickers of the most active stocks.
     """
-    screener = Screener()
-    # Use the 'most_actives' screener to get the most active tickers
-    data = screener.get_screeners('most_actives', count=50)
-    results = data['most_actives']['quotes']
-    tickers = [item['symbol'] for item in results]
-    return tickers
+    return provider.most_active(count=50)
 
 
 # Function to fetch fundamental data
-def fetch_fundamental_data_yahoo(tickers, crypto_tickers, etf_tickers, max_workers=10):
+def fetch_fundamental_data_yahoo(provider, tickers, crypto_tickers, etf_tickers,
+                                 max_workers=10, rate=10.0, deadline=120, cache=None,
+                                 missing=None):
     """
     Fetch fundamental data for a list of tickers using Yahoo Finance API.
     Args:
+        provider (MarketDataProvider): Market-data backend.
         tickers (list): List of tickers to fetch data for.
         crypto_tickers (list): List of cryptocurrency tickers.
         etf_tickers (list): List of ETF tickers.
-        max_workers (int): Maximum number of threads for parallel processing.
+        max_workers (int): Maximum number of concurrent requests.
+        rate (float): Maximum requests per second.
+        deadline (float): Seconds allowed per batch; unfinished tickers
+            are reported as failed.
+        cache (FundamentalsCache): Cache of raw fundamentals. When given,
+            only expired entries are fetched from the provider.
+        missing (list): When given, extended with the tickers for which no
+            fundamentals could be fetched or served from cache.
     Returns:
         dict: Dictionary with ticker as key and fundamental data as value.
     """
-    fundamentals = {}
+    def fetch_many(batch):
+        result = fetch_all(provider.info, batch, max_workers=max_workers,
+                           rate=rate, deadline=deadline)
+        for ticker in result.failed:
+            logging.error(f"Error fetching data for {ticker}: {result.errors[ticker]}")
+        return result.results
 
-    def fetch_ticker_data(ticker):
+    if cache is not None:
+        infos = cache.get_many(tickers, fetch_many, provider.quotes)
+    else:
+        infos = fetch_many(tickers)
+    if missing is not None:
+        missing.extend(t for t in tickers if infos.get(t) is None)
+
+    def format_ticker_data(ticker, info):
         # Determine default sector
         if ticker in crypto_tickers:
             default_sector = 'crypto'
@@ -98,10 +154,9 @@ def fetch_fundamental_data_yahoo(tickers, crypto_tickers, etf_tickers, max_worke
         else:
             default_sector = "N/A"
 
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            return {
+        if info is None:
+            return {"Sector": default_sector, "PE Ratio": None}
+        return {
         "Sector": info.get("sector", default_sector),
         "PE Ratio": info.get("trailingPE", None),
         "Revenue(Bn)": info.get("totalRevenue", None) / 1_000_000_000\
@@ -126,96 +181,195 @@ def fetch_fundamental_data_yahoo(tickers, crypto_tickers, etf_tickers, max_worke
         "shortName": info.get("shortName", None),
         "debtToEquity": info.get("debtToEquity", None)
             }
-        except Exception as e:
-            print(f"Error fetching data for {ticker}: {e}")
-            return {"Sector": default_sector, "PE Ratio": None}
-
-    # Use ThreadPoolExecutor for parallel processing
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = executor.map(fetch_ticker_data, tickers)
 
     # Combine results into a dictionary
-    fundamentals = {ticker: result for ticker, result in zip(tickers, results)}
+    fundamentals = {ticker: format_ticker_data(ticker, infos.get(ticker)) for ticker in tickers}
 
     return fundamentals
 
-def get_summary_tables_from_prices(df_prices, fundamentals):
+def get_summary_tables_from_prices(df_prices, fundamentals, horizons=DEFAULT_HORIZONS):
     """
         Aggregate the prices into summary table
 
     Args:
         df_prices : DataFrame of yahoo daily prices
         df_fundamentals : DataFrame of yahoo fundamentals
+        horizons : calendar return horizons, see returns.horizon_start
 
     Returns:
         tuple[pd.DataFrame]
     """
-    summary = pd.DataFrame({
-        "price_last": df_prices.iloc[-1],
-        "price_1_d": df_prices.iloc[-1-1],
-        "price_1_w": df_prices.iloc[-7-1],
-        "price_1_m": df_prices.iloc[-30-1],
-        "price_6_m": df_prices.iloc[-182-1],
-        "price_1_y": df_prices.iloc[-365-1],
-        "price_ath": df_prices.max(),
-        "price_1Y_H": df_prices.iloc[-365:].max(),
-        "prie_1Y_L": df_prices.iloc[-365:].min(),
-    })
+    summary = ReturnEngine(df_prices).table(horizons)
     summary = summary.merge(fundamentals, left_index=True, right_index=True)
-    summary['1d_return']=summary['price_last']/summary['price_1_d']-1
-    summary['1w_return']=summary['price_last']/summary['price_1_w']-1
-    summary['1m_return']=summary['price_last']/summary['price_1_m']-1
-    summary['1y_return']=summary['price_last']/summary['price_1_y']-1
-    summary['dist_ath']=summary['price_last']/summary['price_ath']-1
     return summary
 
-@st.cache_data
-def get_data(now_ts):
+def refresh_prices(provider, store, asset_class, tickers, start_date, missing=None):
     """
-    Load price data from Yahoo API
+    Bring the local price store up to date and load prices from it.
+
+    Tickers new to the universe get their full history from `start_date`;
+    stored tickers only download the bars from their own last stored date
+    on, in one request per distinct date.
+    Tickers that cannot be downloaded are logged and served from whatever
+    history the store already holds.
 
     Args:
-        now_ts (int): Current timestamp (rounded to nearest hour).
-            Only used by the caching mechanism.
+        provider (MarketDataProvider): Market-data backend.
+        store (PriceStore): Local price store.
+        asset_class (str): Store partition, e.g. 'equity' or 'crypto'.
+        tickers (list): Tickers to refresh.
+        start_date (str): First date of history for new tickers.
+        missing (list): When given, extended with the tickers that could
+            not be downloaded.
 
     Returns:
-        tuple[pd.DataFrame, pd.DataFrame, datetime]
+        pd.DataFrame: Close prices (dates x tickers) read from the store.
     """
-    most_active_tickers = fetch_most_active_tickers()
-    memes_tickers = [s for s in most_active_tickers if s not in sp500_tickers]
-    all_equity_tickers = sp500_tickers + etf_tickers + memes_tickers
+    last_dates = store.last_dates(asset_class, tickers)
+    new_tickers = [t for t, d in last_dates.items() if d is None]
 
-    # Fetch historical prices
-    start_date = "2010-01-01"
-    
-    try:
-        data_equity = yf.download(all_equity_tickers, start=start_date)
-    except Exception as e:
-        logging.error(f"Failed to download equity prices: {e}")
-    try:
-        data_crypto = yf.download(crypto_tickers, start=start_date)
-    except Exception as e:
-        logging.error(f"Failed to download equity prices: {e}")
-        
-    prices_eq = data_equity["Close"]
-    prices_crypto = data_crypto["Close"]
-    
-    # Fetch and process fundamental data
+    # One request per last stored date, so a stale ticker (halted, delisted,
+    # back in the most-actives list) does not drag the others back with it
+    by_date = {}
+    for ticker, last_date in last_dates.items():
+        if last_date is not None:
+            by_date.setdefault(last_date, []).append(ticker)
+
+    requests = []
+    if new_tickers:
+        requests.append((new_tickers, start_date))
+    for last_date in sorted(by_date, reverse=True):
+        requests.append((by_date[last_date], last_date.strftime("%Y-%m-%d")))
+
+    for request_tickers, request_start in requests:
+        with span("download_history", asset_class=asset_class, tickers=len(request_tickers),
+                  start=request_start) as download:
+            history = download_history(provider, request_tickers, request_start)
+            download["missing"] = len(history.missing)
+        with span("store_write", asset_class=asset_class):
+            store.write(asset_class, history.close)
+        if history.missing:
+            logging.error(f"Failed to download {asset_class} prices for {history.missing}")
+            if missing is not None:
+                missing.extend(history.missing)
+
+    with span("store_read", asset_class=asset_class, tickers=len(tickers)):
+        return store.read(asset_class, tickers)
+
+def resume_risk_engine():
+    """
+    Load the risk state saved with the last published snapshot into `risk_engine`.
+
+    Returns:
+        bool: Whether a saved state was found.
+    """
+    manifest = read_manifest()
+    if manifest is None:
+        return False
+    return risk_engine.restore(SNAPSHOT_DIR / manifest["version"])
+
+def build_snapshot():
+    """
+    Load price data from the configured market-data provider
+
+    Returns:
+        Snapshot: prices, summary table, UTC build time, indicators, the
+            correlation matrix of daily returns, sector aggregates and the
+            tickers that could not be refreshed.
+    """
+    missing = {"prices": [], "fundamentals": []}
+    with span("build_snapshot") as build:
+        provider = get_provider()
+        with span("most_active"):
+            most_active_tickers = fetch_most_active_tickers(provider)
+        memes_tickers = [s for s in most_active_tickers if s not in sp500_tickers]
+        all_equity_tickers = sp500_tickers + etf_tickers + memes_tickers
+
+        # Refresh historical prices in the local store
+        store = PriceStore()
+        prices_eq = refresh_prices(provider, store, "equity", all_equity_tickers, START_DATE,
+                                   missing=missing["prices"])
+        prices_crypto = refresh_prices(provider, store, "crypto", crypto_tickers, START_DATE,
+                                       missing=missing["prices"])
+
+        # Fetch and process fundamental data
+        with span("fundamentals", tickers=len(all_equity_tickers + crypto_tickers)):
+            fundamentals_cache.evict(all_equity_tickers + crypto_tickers)
+            fundamental_data = fetch_fundamental_data_yahoo(
+                provider=provider,
+                tickers=all_equity_tickers+crypto_tickers,
+                crypto_tickers=crypto_tickers,
+                etf_tickers=etf_tickers,
+                max_workers=10,
+                cache=fundamentals_cache,
+                missing=missing["fundamentals"]
+            )
+
+        # Create a DataFrame for fundamentals
+        fundamentals = pd.DataFrame.from_dict(fundamental_data, orient="index")
+
+        # Create summary table
+        # An asset class that could not be downloaded at all (its tickers are
+        # in `missing`) is left out rather than failing the whole snapshot
+        with span("summary"):
+            summary = pd.concat([get_summary_tables_from_prices(p, fundamentals)
+                                 for p in (prices_eq, prices_crypto) if not p.empty])
+        with span("price_matrix"):
+            prices = PriceMatrix.from_frames({"equity": prices_eq, "crypto": prices_crypto})
+        with span("indicators"):
+            indicators = IndicatorCube.compute(prices)
+        with span("risk") as risk:
+            if not risk_engine.has_state:
+                resume_risk_engine()
+            risk_metrics, correlation = risk_engine.update(prices)
+            risk["incremental"] = risk_engine.incremental
+            summary = summary.join(risk_metrics)
+        with span("sectors"):
+            sectors = SectorAggregates.compute(summary, prices)
+        update_dt = datetime.datetime.now(tz=datetime.timezone.utc)
+
+        sizes = {"prices": prices.nbytes, "indicators": indicators.nbytes,
+                 "correlation": correlation.to_numpy().nbytes,
+                 "summary": int(summary.memory_usage(deep=True).sum())}
+        for part, size in sizes.items():
+            REGISTRY.set("yfh_snapshot_bytes", size, part=part)
+        build.update(tickers=len(summary), bytes=sum(sizes.values()),
+                     **{f"missing_{kind}": len(tickers) for kind, tickers in missing.items()})
+
+    return Snapshot(prices, summary, update_dt, indicators, correlation, sectors, missing,
+                    risk=risk_engine.copy())
+
+def get_symbol_data(symbol, provider=None, store=None):
+    """
+    Load one symbol's full history and summary row without building the universe.
+
+    History comes from the local price store, downloading only the bars it
+    is missing, and fundamentals from the fundamentals cache.
+
+    Args:
+        symbol (str): Ticker to load.
+        provider (MarketDataProvider): Market-data backend, defaults to the
+            configured one.
+        store (PriceStore): Local price store.
+
+    Returns:
+        tuple[pd.Series, pd.Series, pd.DataFrame]: Close prices, the symbol's
+            summary row and its indicators.
+    """
+    provider = provider or get_provider()
+    store = store or PriceStore()
+    asset_class = "crypto" if symbol in crypto_tickers else "equity"
+    history = refresh_prices(provider, store, asset_class, [symbol], START_DATE)
+    if history.empty:
+        raise KeyError(f"No price history for {symbol}")
     fundamental_data = fetch_fundamental_data_yahoo(
-        tickers=all_equity_tickers+crypto_tickers,
+        provider=provider,
+        tickers=[symbol],
         crypto_tickers=crypto_tickers,
         etf_tickers=etf_tickers,
-        max_workers=10
+        cache=fundamentals_cache
     )
-    
-    # Create a DataFrame for fundamentals
     fundamentals = pd.DataFrame.from_dict(fundamental_data, orient="index")
-    
-    # Create summary table
-    summary_eq = get_summary_tables_from_prices(prices_eq, fundamentals)
-    summary_crypto = get_summary_tables_from_prices(prices_crypto, fundamentals)
-    summary = pd.concat([summary_eq,summary_crypto])
-    prices = pd.concat([prices_eq,prices_crypto],axis=1).ffill()
-    update_dt = datetime.datetime.now(tz=datetime.timezone.utc)
-    
-    return prices, summary, update_dt
+    summary = get_summary_tables_from_prices(history, fundamentals)
+    indicators = IndicatorCube.compute(PriceMatrix.from_frames({asset_class: history}))
+    return history[symbol], summary.loc[symbol], indicators.frame(symbol)
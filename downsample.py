@@ -0,0 +1,142 @@
+import threading
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+
+"""
+downsample.py
+
+Shape-preserving downsampling of time series for charts, so figure payloads
+stay bounded by the chart's pixel budget instead of growing with history.
+"""
+
+# Points kept per trace, roughly two per horizontal pixel of a wide chart
+MAX_POINTS = 2000
+
+_cache = LRUCache(maxsize=512)
+_cache_lock = threading.Lock()
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: keep the point of each bucket forming the
+    largest triangle with the previously kept point and the next bucket's mean.
+
+    Args:
+        x (np.ndarray): Increasing x values (float), shape (n,).
+        y (np.ndarray): y values without NaN, shape (n,) or (n, k) to
+            downsample k series sharing `x` in one pass.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Positions of the kept points, shape (n_out,) or (n_out, k).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n) if y.ndim == 1 else np.tile(np.arange(n)[:, None], (1, y.shape[1]))
+    y2 = y.reshape(n, -1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # Mean of every bucket, the last one being the last point; bucket i is
+    # scored against the mean of bucket i + 1
+    sums_x = np.add.reduceat(x, edges)
+    sums_y = np.add.reduceat(y2, edges, axis=0)
+    counts = np.diff(np.append(edges, n))[:, None]
+    avg_x = (sums_x[:, None] / counts)[1:]
+    avg_y = (sums_y / counts)[1:]
+    columns = np.arange(y2.shape[1])
+    kept = np.empty((n_out, y2.shape[1]), dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = kept[0]
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        xa, ya = x[a], y2[a, columns]
+        area = np.abs((xa - avg_x[i, 0]) * (y2[start:end] - ya)
+                      - (xa - x[start:end, None]) * (avg_y[i] - ya))
+        a = start + np.argmax(area, axis=0)
+        kept[i + 1] = a
+    return kept[:, 0] if y.ndim == 1 else kept
+
+
+def minmax(y, n_out):
+    """
+    Keep the minimum and maximum of each of `n_out // 2` buckets.
+
+    Args:
+        y (np.ndarray): y values without NaN.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Positions of the kept points.
+    """
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    kept = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = y[start:end]
+        kept += sorted({start + int(np.argmin(bucket)), start + int(np.argmax(bucket))})
+    return np.array(kept)
+
+
+def downsample_frame(frame, n_out=MAX_POINTS, key=None):
+    """
+    LTTB-downsample every column of a NaN-free frame in one vectorized pass.
+
+    Args:
+        frame (pd.DataFrame): Values indexed by date, without NaN.
+        n_out (int): Point budget per column.
+        key (tuple): Cache key, see `downsample`.
+
+    Returns:
+        dict: column -> downsampled pd.Series.
+    """
+    if key is not None:
+        with _cache_lock:
+            cached = _cache.get(key)
+        if cached is not None:
+            return cached
+    x = frame.index.asi8.astype("float64")
+    kept = lttb(x, frame.to_numpy(dtype="float64"), n_out)
+    result = {col: frame[col].iloc[kept[:, j]] for j, col in enumerate(frame.columns)}
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = result
+    return result
+
+
+def downsample(series, n_out=MAX_POINTS, method="lttb", key=None):
+    """
+    Downsample a series to at most `n_out` points, dropping NaN first.
+
+    Args:
+        series (pd.Series): Values indexed by date.
+        n_out (int): Point budget.
+        method (str): 'lttb' or 'minmax'.
+        key (tuple): Cache key identifying the series, its date range and
+            data version, e.g. (version, symbol, start, n_out). Results are
+            cached when given.
+
+    Returns:
+        pd.Series: The kept points.
+    """
+    if key is not None:
+        with _cache_lock:
+            cached = _cache.get(key)
+        if cached is not None:
+            return cached
+    series = series.dropna()
+    if method == "lttb":
+        x = series.index.asi8.astype("float64") if isinstance(series.index, pd.DatetimeIndex) \
+            else np.arange(len(series), dtype="float64")
+        kept = lttb(x, series.to_numpy(dtype="float64"), n_out)
+    elif method == "minmax":
+        kept = minmax(series.to_numpy(dtype="float64"), n_out)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    result = series.iloc[kept]
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = result
+    return result
@@ -0,0 +1,202 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from metrics import REGISTRY
+
+"""
+fetcher.py
+
+Concurrent fetch engine for per-ticker upstream calls. Requests go through a
+token bucket (rate limit) and an adaptive concurrency limit that halves on
+throttling or errors and grows back one slot at a time on success. Failed
+calls are retried with jittered exponential backoff, and a per-call deadline
+bounds the total time: whatever finished is returned with the list of
+tickers that did not.
+"""
+
+
+@dataclass
+class FetchResult:
+    """Outcome of `fetch_all`."""
+    results: dict = field(default_factory=dict)
+    failed: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
+    retries: int = 0
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second, bursting to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """
+        Block until a token is available.
+
+        Args:
+            deadline (float): `time.monotonic()` value to give up at.
+
+        Returns:
+            bool: False if the deadline passed before a token was available.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_time = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait_time > deadline:
+                return False
+            time.sleep(wait_time)
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    The limit starts at `max_limit`, is halved on every throttled or failed
+    call and grows by one after `limit` consecutive successes.
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = max_limit
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline=None):
+        with self._cond:
+            while self._active >= self.limit:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    return False
+                self._cond.wait(timeout)
+            self._active += 1
+            return True
+
+    def cancel(self):
+        """Give back a slot whose call never started, leaving the limit unchanged."""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def release(self, ok):
+        with self._cond:
+            self._active -= 1
+            if ok:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            else:
+                self.limit = max(self.min_limit, self.limit // 2)
+                self._successes = 0
+            self._cond.notify_all()
+
+
+def is_throttled(error):
+    """Whether an exception looks like upstream rate limiting (HTTP 429)."""
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text or "rate limit" in text or "too many requests" in text or "429" in text
+
+
+def fetch_all(fn, items, max_workers=10, rate=10.0, retries=3, backoff=0.5, deadline=None,
+              name=None):
+    """
+    Call `fn(item)` for every item with rate limiting, adaptive concurrency and retries.
+
+    Args:
+        fn (callable): item -> result; raises on failure.
+        items (list): Items (tickers) to fetch.
+        max_workers (int): Upper bound on concurrent calls.
+        rate (float): Maximum calls per second.
+        retries (int): Retries per item after the first attempt.
+        backoff (float): Base backoff in seconds, doubled on every retry
+            and jittered uniformly in [0, backoff * 2**attempt].
+        deadline (float): Seconds allowed for the whole batch, or None.
+        name (str): `op` label of the call metrics, defaults to `fn.__name__`.
+
+    Returns:
+        FetchResult: Results of successful items, failed items and their last error.
+    """
+    result = FetchResult()
+    if not items:
+        return result
+    stop_at = None if deadline is None else time.monotonic() + deadline
+    op = name or getattr(fn, "__name__", "fetch")
+    bucket = TokenBucket(rate)
+    limiter = AdaptiveLimiter(max_workers)
+    lock = threading.Lock()
+
+    def task(item):
+        for attempt in range(retries + 1):
+            if not limiter.acquire(stop_at):
+                raise TimeoutError("Deadline reached before the call could start")
+            if not bucket.acquire(stop_at):
+                limiter.cancel()
+                raise TimeoutError("Deadline reached before the call could start")
+            ok = False
+            started = time.perf_counter()
+            try:
+                value = fn(item)
+                ok = True
+                return value
+            except Exception as e:
+                error = e
+            finally:
+                limiter.release(ok)
+                REGISTRY.observe("yfh_fetch_seconds", time.perf_counter() - started, op=op)
+            if attempt == retries:
+                raise error
+            with lock:
+                result.retries += 1
+            REGISTRY.inc("yfh_fetch_retries_total", op=op)
+            delay = random.uniform(0, backoff * 2 ** attempt)
+            if is_throttled(error):
+                delay += backoff
+            if stop_at is not None and time.monotonic() + delay > stop_at:
+                raise error
+            time.sleep(delay)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(task, item): item for item in items}
+    timeout = None if stop_at is None else max(stop_at - time.monotonic(), 0)
+    done, not_done = wait(futures, timeout=timeout)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for future in done:
+        item = futures[future]
+        try:
+            result.results[item] = future.result()
+        except Exception as e:
+            result.failed.append(item)
+            result.errors[item] = e
+    for future in not_done:
+        item = futures[future]
+        result.failed.append(item)
+        result.errors[item] = TimeoutError("Deadline reached")
+
+    REGISTRY.inc("yfh_fetch_items_total", len(result.results), op=op, outcome="success")
+    REGISTRY.inc("yfh_fetch_items_total", len(result.failed), op=op, outcome="failure")
+    if result.failed:
+        logging.warning(
+            f"Fetched {len(result.results)}/{len(items)} items, "
+            f"{len(result.failed)} failed, {result.retries} retries"
+        )
+    return result
@@ -4,42 +4,203 @@ Created on Fri Jan 25 2025
 """
 
 #import relevant libraries (visualization, dashboard, data manipulation)
+#The data pipeline (data.py and its providers) is imported only when this
+#process builds snapshots or loads a symbol on its own.
+import logging
 import pandas as pd 
 import streamlit as st
 import datetime
-from data import get_data
+from indicators import DEFAULT_OVERLAYS, INDICATORS
+from live import LIVE_INTERVAL, LiveFeed
+from metrics import ADMIN_PANEL, REGISTRY, configure_event_logging, serve, track_cache
+from refresh import APP_REFRESH
+from snapshot_store import SNAPSHOT_WAIT, SharedSnapshot
 from style_and_plot import (SHORT_COLUMNS, 
                             FUNDAMENTALS_COLUMNS,
+                            RISK_COLUMNS,
                             style_dataframe,
                             filter_dataframe,
                             create_tree_map,
                             plot_multiple_symbols,
+                            plot_correlation_heatmap,
                             plot_single_symbol,
                             display_metrics,
                             display_price_metrics,
-                            display_fundamental_metrics)
-
-#create dataframes from the function 
-now_dt = datetime.datetime.now(tz=datetime.timezone.utc)
-now_hr_ts = (now_dt.timestamp() // 3600) * 3600
-prices, summary, update_dt = get_data(now_hr_ts)
-min_ago = int(max((now_dt - update_dt).total_seconds() // 60, 0))
-s = "" if min_ago == 1 else "s"
-st.markdown(
-    f"""
-    Market data was last updated {min_ago} minute{s} ago at
-    {str(update_dt)[:16]} UTC."""
-) 
+                            display_fundamental_metrics,
+                            display_diagnostics)
+
+logging.basicConfig(level=logging.INFO)
+configure_event_logging()
+
+def build_snapshot():
+    """Build a new snapshot in this process (snapshot producer only)."""
+    from data import build_snapshot
+    return build_snapshot()
+
+@st.cache_resource
+def get_shared_snapshot():
+    """Market data snapshot shared with the other app processes on this host."""
+    # With YFH_APP_REFRESH=0 snapshots are only read, published by build_snapshot_cli.py
+    serve()
+    return SharedSnapshot(build_snapshot if APP_REFRESH else None)
+
+@st.cache_resource
+def get_live_feed():
+    """Live prices polled over the shared snapshot (YFH_LIVE_INTERVAL > 0)."""
+    shared = get_shared_snapshot()
+    return LiveFeed(lambda: shared.get(timeout=0)).start()
+
+@track_cache(st.cache_data(ttl=3600))
+def load_symbol_data(symbol):
+    """History and summary row of a symbol missing from the snapshot."""
+    from data import get_symbol_data
+    return get_symbol_data(symbol)
+
+@track_cache(st.cache_resource(max_entries=4))
+def tree_map_figure(version, _summary, _sectors):
+    """Market tree map, built once per snapshot version."""
+    return create_tree_map(_summary, _sectors)
+
+@track_cache(st.cache_resource(max_entries=32))
+def sector_comparison_figure(version, sectors, start_date, _index_series):
+    """Cap-weighted sector indexes since `start_date`, rebased to 1."""
+    df_graph = _index_series[list(sectors)].dropna()[lambda x : x.index>=start_date.isoformat()]
+    return plot_multiple_symbols(df_graph, version=version, title='Sector Performance')
+
+@track_cache(st.cache_resource(max_entries=32))
+def sector_figure(version, symbols, start_date, _prices):
+    """Normalized performance chart of a sector's symbols since `start_date`."""
+    df_graph = _prices[list(symbols)].dropna()[lambda x : x.index>=start_date.isoformat()]
+    return plot_multiple_symbols(df_graph, version=version)
+
+@track_cache(st.cache_resource(max_entries=32))
+def correlation_figure(version, symbols, _correlation):
+    """Correlation heatmap of a sector's symbols."""
+    return plot_correlation_heatmap(_correlation, symbols)
+
+@track_cache(st.cache_resource(max_entries=64, ttl=3600))
+def single_symbol_figure(version, symbol, start_date, overlays, panel, _history, _indicators):
+    """Price and indicator chart of one symbol since `start_date`."""
+    df_graph = _history.to_frame().loc[lambda x: x.index >= pd.Timestamp(start_date)]
+    return plot_single_symbol(df_graph, _indicators, overlays=overlays, panel=panel,
+                              version=version)
+
+# Deep links (?symbol=XYZ) open the Single Symbol view directly
+deep_link_symbol = st.query_params.get("symbol")
+add_sidebar = st.sidebar.selectbox('All Market or Single Stock', ('Market', 'Single Symbol'),
+                                   index=1 if deep_link_symbol else 0)
+
+#create dataframes from the latest snapshot, refreshed in the background.
+#Single Symbol mode does not wait for a first snapshot to be built.
+if add_sidebar == 'Market':
+    with st.spinner("Loading market data..."):
+        snapshot = get_shared_snapshot().get(timeout=SNAPSHOT_WAIT)
+    if snapshot is None:
+        source = "built yet, see the server logs" if APP_REFRESH else \
+            "published yet, check that build_snapshot_cli.py runs"
+        st.error(f"No market data snapshot was {source}. Please retry later.")
+        st.stop()
+else:
+    snapshot = get_shared_snapshot().get(timeout=0)
+
+#In live mode the last bar and the columns derived from it follow the live feed
+if LIVE_INTERVAL and snapshot is not None:
+    snapshot = get_live_feed().get() or snapshot
+
+if snapshot is not None:
+    prices, summary, update_dt = snapshot.prices, snapshot.summary, snapshot.update_dt
+    # Figures and tables are memoized on the version, which follows live ticks
+    version = snapshot.version
+    now_dt = datetime.datetime.now(tz=datetime.timezone.utc)
+    min_ago = int(max((now_dt - update_dt).total_seconds() // 60, 0))
+    s = "" if min_ago == 1 else "s"
+    live_note = f" Live prices every {LIVE_INTERVAL}s." if LIVE_INTERVAL else ""
+    if snapshot.live_dt is not None:
+        live_note += f" Last live tick at {snapshot.live_dt:%H:%M:%S} UTC."
+    st.markdown(
+        f"""
+        Market data was last updated {min_ago} minute{s} ago at
+        {str(update_dt)[:16]} UTC.{live_note}"""
+    ) 
+
+if LIVE_INTERVAL and snapshot is not None:
+    @st.fragment(run_every=LIVE_INTERVAL)
+    def live_updates(version):
+        """Rerun the page when the live feed has a newer tick than `version`."""
+        latest = get_live_feed().get()
+        if latest is not None and latest.version != version:
+            st.rerun()
+
+    live_updates(version)
+
+# Optional diagnostics of this process: stage timings, fetch and cache counters
+if ADMIN_PANEL:
+    with st.sidebar.expander("Diagnostics"):
+        st.write(f"Snapshot producer: {get_shared_snapshot().is_producer}")
+        display_diagnostics(REGISTRY.samples())
 
 ###############################################################################
 #Start building Streamlit App
 ###############################################################################
 
-add_sidebar = st.sidebar.selectbox('All Market or Single Stock', ('Market', 'Single Symbol'))
-
 # Title
 st.title("Screening App")
 
+# Market view sections. Each fragment reruns on its own when one of its
+# widgets changes; figures are memoized on the snapshot version and inputs.
+@st.fragment
+def filtered_market_section(summary, version):
+    """Screening table."""
+    st.subheader("Filtered Market")
+    filtered_df = filter_dataframe(summary, version=version)
+    df_print = style_dataframe(filtered_df[SHORT_COLUMNS])
+    st.dataframe(df_print)
+
+@st.fragment
+def sector_comparison_section(snapshot):
+    """Sector return table and sector-vs-sector index chart."""
+    sectors, version = snapshot.sectors, snapshot.version
+    weighting = st.radio("Weighting:", ("cap", "equal"), horizontal=True,
+                         format_func=lambda w: "Cap-weighted" if w == "cap" else "Equal-weighted")
+    st.dataframe(style_dataframe(sectors.table(weighting)))
+    
+    if sectors.index_series is not None:
+        names = [s for s in sectors.sectors if s in sectors.index_series.columns]
+        default = [s for s in names if s not in ('etf', 'crypto')]
+        sectors_select = st.multiselect("Compare sectors:", names, default=default)
+        start_date_select = st.date_input("Select a starting date for sector graph:",
+                                          value=datetime.date(2024,1,1))
+        fig = sector_comparison_figure(version, tuple(sectors_select), start_date_select,
+                                       sectors.index_series)
+        st.plotly_chart(fig)
+
+@st.fragment
+def sector_section(snapshot):
+    """Sector table, performance chart, risk table and correlation heatmap."""
+    summary, version = snapshot.summary, snapshot.version
+    sectors = tuple(snapshot.sectors.sectors)
+    st.write("Sector Performance")
+    sector_select = st.selectbox('Pick a Sector:', sectors,
+                                 index=sectors.index('Technology') if 'Technology' in sectors else 0)
+    df_summary_sector = summary.loc[snapshot.sectors.members[sector_select], SHORT_COLUMNS]
+    df_print2 = style_dataframe(df_summary_sector)
+    st.dataframe(df_print2)
+    
+    # Add graph for the Sector
+    default_date=datetime.date(2024,1,1)
+    symbols_sector = tuple(df_summary_sector.index)
+    graph_start_date_select = st.date_input("Select a starting date for graph:", value=default_date)
+    fig = sector_figure(version, symbols_sector, graph_start_date_select, snapshot.prices)
+    st.plotly_chart(fig)
+    
+    # Risk metrics and return correlation of the Sector
+    st.write("Sector Risk")
+    df_risk = summary.loc[list(symbols_sector), summary.columns.intersection(RISK_COLUMNS)]
+    st.dataframe(style_dataframe(df_risk))
+    if snapshot.correlation is not None:
+        fig = correlation_figure(version, symbols_sector, snapshot.correlation)
+        st.plotly_chart(fig)
+
 #Show individual metrics 
 if add_sidebar == 'Market':
     # add table for all available stocks
@@ -47,7 +208,7 @@ if add_sidebar == 'Market':
     st.subheader("All Market")
     
     # Plot Map Tree Last Day Return
-    fig=create_tree_map(summary)
+    fig=tree_map_figure(version, summary, snapshot.sectors)
     st.plotly_chart(fig)
     
     # Plot details dataframes
@@ -55,27 +216,12 @@ if add_sidebar == 'Market':
     st.dataframe(df_print)
     
     # Plot details dataframes
-    st.subheader("Filtered Market")
-    filtered_df = filter_dataframe(summary)
-    df_print = style_dataframe(filtered_df[SHORT_COLUMNS])
-    st.dataframe(df_print)
+    filtered_market_section(summary, version)
     
     # add table for specific sector
     st.header("Sector Data")
-    sectors = tuple(set(summary['Sector']))
-    st.write("Sector Performance")
-    sector_select = st.selectbox('Pick a Sector:', sectors, index=list(sectors).index('Technology'))
-    df_summary_sector = summary[SHORT_COLUMNS][lambda x : x.Sector==sector_select]
-    df_print2 = style_dataframe(df_summary_sector)
-    st.dataframe(df_print2)
-    
-    # Add graph for the Sector
-    default_date=datetime.date(2024,1,1)
-    symbols_sector = df_summary_sector.index
-    graph_start_date_select = st.date_input("Select a starting date for graph:", value=default_date)
-    df_graph = prices[symbols_sector].dropna()[lambda x : x.index>=graph_start_date_select.isoformat()]
-    fig = plot_multiple_symbols(df_graph)
-    st.plotly_chart(fig)
+    sector_comparison_section(snapshot)
+    sector_section(snapshot)
     
 if add_sidebar == 'Single Symbol':
     
@@ -83,23 +229,54 @@ if add_sidebar == 'Single Symbol':
     st.subheader("Symbol Performance")
     
     # Select the symbol
+    if snapshot is not None:
+        symbols = list(summary['symbol'])
+    else:
+        from data import sp500_tickers, etf_tickers, crypto_tickers
+        symbols = sp500_tickers + etf_tickers + crypto_tickers
+    default_symbol = 'AAPL'
+    if deep_link_symbol:
+        link_symbol = deep_link_symbol.strip().upper()
+        # Symbols outside the universe are only offered if they have a history
+        if link_symbol not in symbols:
+            try:
+                with st.spinner(f"Loading {link_symbol}..."):
+                    load_symbol_data(link_symbol)
+                symbols.append(link_symbol)
+            except KeyError:
+                st.warning(f"Unknown symbol: {link_symbol}")
+        if link_symbol in symbols:
+            default_symbol = link_symbol
+    if default_symbol not in symbols:
+        symbols.append(default_symbol)
     symbol_select = st.selectbox('Pick a Symbol:', 
-                                 tuple(summary['symbol']),
-                                 index=list(summary['symbol']).index('AAPL'))
+                                 tuple(symbols),
+                                 index=symbols.index(default_symbol))
+
+    # Serve the symbol from the snapshot when it has it, otherwise load it alone
+    if snapshot is not None and symbol_select in summary.index:
+        history, summary_row = prices[symbol_select], summary.loc[symbol_select]
+        indicators = snapshot.indicators.frame(symbol_select)
+    else:
+        try:
+            with st.spinner(f"Loading {symbol_select}..."):
+                history, summary_row, indicators = load_symbol_data(symbol_select)
+        except KeyError:
+            st.error(f"No price history available for {symbol_select}.")
+            st.stop()
 
     # Display Symbol Fundamentals
-    summary_stock = summary.loc[symbol_select].to_frame('fundamentals')
     STR_COLUMNS = ['symbol', 'shortName', 'Sector']
     col1, col2, col3 = st.columns(3)
-    display_metrics([col1, col2, col3], STR_COLUMNS, summary_stock['fundamentals'])
+    display_metrics([col1, col2, col3], STR_COLUMNS, summary_row)
 
     # Display Price Metrics
-    summary_stock_price = summary.filter(regex='price').loc[symbol_select].to_frame('prices')
+    summary_stock_price = summary_row.filter(regex='price')
     col1, col2, col3, col4 = st.columns(4)
-    display_price_metrics([col1, col2, col3, col4], summary_stock_price['prices'], summary_stock_price.loc['price_last'])
+    display_price_metrics([col1, col2, col3, col4], summary_stock_price, summary_stock_price['price_last'])
 
     # Graph Stock Using a slicer 
-    all_dates = prices[symbol_select].dropna().index
+    all_dates = history.dropna().index
     min_date = all_dates.min().date()
     max_date = all_dates.max().date()
 
@@ -111,13 +288,22 @@ if add_sidebar == 'Single Symbol':
         format="YYYY-MM-DD"
     )
     
-    df_graph = prices.loc[lambda x: x.index >= pd.Timestamp(graph_start_date_select)][[symbol_select]]
-    fig = plot_single_symbol(df_graph)
+    overlay_names = [n for n, (_, _, kind) in INDICATORS.items() if kind == 'overlay']
+    panel_names = [n for n, (_, _, kind) in INDICATORS.items() if kind == 'panel']
+    col1, col2 = st.columns(2)
+    overlays = col1.multiselect("Overlays:", overlay_names, default=list(DEFAULT_OVERLAYS),
+                                format_func=lambda n: INDICATORS[n][0])
+    panel = col2.selectbox("Lower panel:", [None] + panel_names,
+                           format_func=lambda n: "None" if n is None else INDICATORS[n][0])
+
+    data_version = version if snapshot is not None else history.index[-1]
+    fig = single_symbol_figure(data_version, symbol_select, graph_start_date_select,
+                               tuple(overlays), panel, history, indicators)
     st.plotly_chart(fig)
     
     st.subheader("Symbol Fundamentals")
 
-    summary_stock = summary[FUNDAMENTALS_COLUMNS].loc[[symbol_select]].dropna(axis=1)
+    summary_stock = summary_row.reindex(FUNDAMENTALS_COLUMNS).to_frame(symbol_select).T.dropna(axis=1)
     pct_columns = ['dividendYield', 'shortPercentOfFloat']
 
     col1, col2, col3, col4, col5 = st.columns(5)
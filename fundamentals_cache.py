@@ -0,0 +1,204 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from cachetools import LRUCache
+from metrics import REGISTRY
+from price_store import DATA_DIR, _write_atomically
+from providers import QUOTE_FIELDS
+
+"""
+fundamentals_cache.py
+
+Tiered cache of raw `Ticker.info` fundamentals: an in-memory LRU backed by
+one JSON file per ticker on disk. Fields are grouped by how fast they change
+and every group has its own TTL, so a refresh only calls upstream for the
+entries that actually expired.
+"""
+
+# Fields of `Ticker.info` by update frequency
+FIELD_GROUPS = {
+    "static": ["sector", "shortName", "symbol"],
+    "fundamentals": [
+        "totalRevenue", "bookValue", "trailingEps", "forwardEps",
+        "dividendYield", "fiveYearAvgDividendYield", "payoutRatio", "beta",
+        "debtToEquity", "shortPercentOfFloat",
+    ],
+    "market": list(QUOTE_FIELDS.values()),
+}
+
+# Seconds before a group is considered stale
+DEFAULT_TTLS = {
+    "static": 7 * 24 * 3600,
+    "fundamentals": 24 * 3600,
+    "market": 15 * 60,
+}
+
+# Groups refreshed with one batched quote call instead of per-ticker info calls
+BATCHED_GROUPS = {"market"}
+
+
+class FundamentalsCache:
+    """
+    Fundamentals cache with per-group TTLs and stale-while-revalidate reads.
+
+    A ticker whose per-ticker groups are past their TTL is still served from
+    cache and refreshed in the background, unless it is older than
+    `ttl + max_stale`, in which case it is fetched synchronously. Batched
+    groups are refreshed for all expired tickers with a single quote call.
+    """
+
+    def __init__(self, root=None, ttls=None, max_stale=7 * 24 * 3600,
+                 maxsize=2048, revalidate_workers=1):
+        self.root = Path(root or DATA_DIR) / "fundamentals"
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_stale = max_stale
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._executor = ThreadPoolExecutor(max_workers=revalidate_workers)
+
+    def _path(self, ticker):
+        return self.root / f"{ticker}.json"
+
+    def _get(self, ticker):
+        with self._lock:
+            entry = self._memory.get(ticker)
+        if entry is not None:
+            return entry
+        path = self._path(ticker)
+        if not path.exists():
+            return None
+        try:
+            entry = json.loads(path.read_text())
+        except ValueError as e:
+            logging.warning(f"Dropping corrupted fundamentals cache entry {path}: {e}")
+            return None
+        with self._lock:
+            self._memory[ticker] = entry
+        return entry
+
+    def _put(self, ticker, entry):
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Revalidation, quote refreshes and other processes may write the same ticker
+        _write_atomically(self._path(ticker),
+                          lambda tmp: Path(tmp).write_text(json.dumps(entry, default=str)))
+        with self._lock:
+            self._memory[ticker] = entry
+
+    def _store_info(self, ticker, info, now):
+        self._put(ticker, {"info": info, "fetched": {g: now for g in FIELD_GROUPS}})
+
+    def _age(self, entry, group, now):
+        return now - entry["fetched"].get(group, 0)
+
+    def _status(self, entry, now):
+        """'fresh', 'stale' or 'expired' over the per-ticker groups."""
+        status = "fresh"
+        for group in FIELD_GROUPS:
+            if group in BATCHED_GROUPS:
+                continue
+            age = self._age(entry, group, now)
+            if age > self.ttls[group] + self.max_stale:
+                return "expired"
+            if age > self.ttls[group]:
+                status = "stale"
+        return status
+
+    def _revalidate(self, tickers, fetch_many):
+        with self._lock:
+            tickers = [t for t in tickers if t not in self._revalidating]
+            self._revalidating.update(tickers)
+        if not tickers:
+            return
+
+        def task():
+            try:
+                for ticker, info in fetch_many(tickers).items():
+                    self._store_info(ticker, info, time.time())
+            except Exception as e:
+                logging.warning(f"Background fundamentals revalidation failed: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.difference_update(tickers)
+
+        self._executor.submit(task)
+
+    def evict(self, keep):
+        """
+        Drop cached tickers that left the universe.
+
+        Args:
+            keep (list): Tickers to keep.
+        """
+        keep = set(keep)
+        with self._lock:
+            for ticker in [t for t in self._memory if t not in keep]:
+                del self._memory[ticker]
+        if self.root.exists():
+            for path in self.root.glob("*.json"):
+                if path.stem not in keep:
+                    path.unlink(missing_ok=True)
+
+    def get_many(self, tickers, fetch_many, fetch_quotes):
+        """
+        Serve fundamentals for `tickers`, calling upstream only for expired entries.
+
+        Args:
+            tickers (list): Tickers to serve.
+            fetch_many (callable): list of tickers -> {ticker: raw info dict}
+                for the tickers that could be fetched.
+            fetch_quotes (callable): list of tickers -> {ticker: market fields}.
+
+        Returns:
+            dict: ticker -> raw info dict. Tickers that could not be fetched
+                and have no cached entry are left out.
+        """
+        now = time.time()
+        entries, fetch_now, stale, quote_tickers = {}, [], [], []
+        for ticker in tickers:
+            entry = self._get(ticker)
+            status = "expired" if entry is None else self._status(entry, now)
+            if entry is not None:
+                entries[ticker] = entry
+            if status == "expired":
+                fetch_now.append(ticker)
+                continue
+            if status == "stale":
+                stale.append(ticker)
+            if any(self._age(entry, g, now) > self.ttls[g] for g in BATCHED_GROUPS):
+                quote_tickers.append(ticker)
+
+        for ticker, info in (fetch_many(fetch_now) if fetch_now else {}).items():
+            self._store_info(ticker, info, now)
+            entries[ticker] = self._get(ticker)
+
+        if quote_tickers:
+            try:
+                quotes = fetch_quotes(quote_tickers)
+            except Exception as e:
+                logging.warning(f"Quote refresh failed, serving cached market fields: {e}")
+                quotes = {}
+            for ticker, quote in quotes.items():
+                entry = entries.get(ticker)
+                if entry is None:
+                    continue
+                entry = {"info": {**entry["info"], **quote},
+                         "fetched": {**entry["fetched"],
+                                     **{g: now for g in BATCHED_GROUPS}}}
+                self._put(ticker, entry)
+                entries[ticker] = entry
+
+        self._revalidate(stale, fetch_many)
+
+        fresh = len(tickers) - len(fetch_now) - len(stale)
+        for status, count in (("fetched", len(fetch_now)), ("stale", len(stale)),
+                              ("fresh", fresh), ("quoted", len(quote_tickers))):
+            REGISTRY.inc("yfh_fundamentals_cache_total", count, status=status)
+        logging.info(
+            f"Fundamentals cache: {len(fetch_now)} fetched, {len(stale)} revalidating, "
+            f"{len(quote_tickers)} quoted, {len(tickers) - len(fetch_now)} served from cache"
+        )
+        return {t: entry["info"] for t, entry in entries.items()}
@@ -0,0 +1,87 @@
+import logging
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from fetcher import fetch_all
+
+"""
+history.py
+
+Chunked, fault-tolerant bulk download of daily close prices. The universe is
+split into chunks downloaded in parallel; failed chunks are retried, then
+their tickers are retried one by one. Tickers that still have no data are
+reported as missing instead of failing the whole refresh.
+"""
+
+
+@dataclass
+class HistoryResult:
+    """Outcome of `download_history`."""
+    close: pd.DataFrame
+    missing: list = field(default_factory=list)
+
+
+def _chunks(tickers, chunk_size):
+    return [tuple(tickers[i:i + chunk_size]) for i in range(0, len(tickers), chunk_size)]
+
+
+def _assemble(frames, tickers):
+    """Build one wide frame from per-chunk frames with a single allocation."""
+    index = frames[0].index
+    for frame in frames[1:]:
+        index = index.union(frame.index)
+    values = np.full((len(index), len(tickers)), np.nan)
+    position = {t: i for i, t in enumerate(tickers)}
+    for frame in frames:
+        frame = frame.loc[:, frame.columns.isin(tickers)].reindex(index)
+        values[:, [position[t] for t in frame.columns]] = frame.to_numpy(dtype="float64")
+    return pd.DataFrame(values, index=index, columns=list(tickers))
+
+
+def download_history(provider, tickers, start, chunk_size=100, max_workers=4,
+                     retries=2, deadline=600):
+    """
+    Download daily close prices for a large universe.
+
+    Args:
+        provider (MarketDataProvider): Market-data backend.
+        tickers (list): Tickers to download.
+        start (str): First date, 'YYYY-MM-DD'.
+        chunk_size (int): Tickers per bulk request.
+        max_workers (int): Chunks downloaded in parallel, capped by the
+            provider's `history_concurrency`.
+        retries (int): Retries of a failed chunk or ticker.
+        deadline (float): Seconds allowed for each download round.
+
+    Returns:
+        HistoryResult: Close prices of the tickers with data, and the
+            tickers that could not be downloaded.
+    """
+    def fetch(chunk):
+        close = provider.history(list(chunk), start)
+        # Bulk downloads return all-NaN columns for tickers they failed on
+        return close.loc[:, close.notna().any()]
+
+    if provider.history_concurrency is not None:
+        max_workers = min(max_workers, provider.history_concurrency)
+    chunks = _chunks(list(dict.fromkeys(tickers)), chunk_size)
+    result = fetch_all(fetch, chunks, max_workers=max_workers, rate=max_workers,
+                       retries=retries, deadline=deadline, name="history_chunk")
+    frames = [f for f in result.results.values() if not f.empty]
+    received = {t for f in frames for t in f.columns}
+
+    retry_tickers = [t for chunk in chunks for t in chunk if t not in received]
+    if retry_tickers:
+        logging.info(f"Retrying {len(retry_tickers)} tickers individually")
+        single = fetch_all(lambda t: fetch((t,)), retry_tickers, max_workers=max_workers,
+                           rate=max_workers, retries=retries, deadline=deadline,
+                           name="history_ticker")
+        frames += [f for f in single.results.values() if not f.empty]
+        received |= {t for f in single.results.values() for t in f.columns}
+
+    downloaded = [t for chunk in chunks for t in chunk if t in received]
+    missing = [t for chunk in chunks for t in chunk if t not in received]
+    if missing:
+        logging.warning(f"No price history for {len(missing)} tickers: {missing}")
+    close = _assemble(frames, downloaded) if frames else pd.DataFrame()
+    return HistoryResult(close=close, missing=missing)
@@ -0,0 +1,141 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+"""
+indicators.py
+
+Technical indicators computed for every ticker at refresh time, one
+vectorized pass per indicator over each price block. Results share the
+layout of the `PriceMatrix` blocks, are stored with the snapshot and are
+served as read-only per-ticker slices, so charts never recompute them.
+"""
+
+# Bars per year by asset-class calendar, used to annualize volatility
+PERIODS_PER_YEAR = {"equity": 252, "crypto": 365}
+
+
+def _full_windows(prices, values, days):
+    """`values` where the window of `days` calendar days is covered by each ticker's history."""
+    ready = prices.notna().idxmax() + pd.Timedelta(days=days - 1)
+    dates = prices.index.to_numpy()
+    if isinstance(prices, pd.Series):
+        return values.where(dates >= ready)
+    return values.where(dates[:, None] >= ready.to_numpy()[None, :])
+
+
+def _sma(prices, days, **_):
+    return _full_windows(prices, prices.rolling(f"{days}D").mean(), days)
+
+
+def _rsi(prices, window=14, **_):
+    delta = prices.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+def _volatility(prices, days=30, periods_per_year=252):
+    returns = np.log(prices).diff()
+    return _full_windows(prices, returns.rolling(f"{days}D").std(), days) \
+        * np.sqrt(periods_per_year)
+
+
+# name -> (label, function of the block's price frame, kind). 'overlay'
+# indicators share the price axis; 'panel' ones are drawn on their own axis.
+# Moving averages and volatility use calendar-day windows, so they span the
+# same period on the 5-day equity and the 7-day crypto calendars; EMA and RSI
+# are defined over bars.
+INDICATORS = {
+    "sma_7": ("7d MA", lambda p, **_: _sma(p, 7), "overlay"),
+    "sma_30": ("30d MA", lambda p, **_: _sma(p, 30), "overlay"),
+    "sma_365": ("365d MA", lambda p, **_: _sma(p, 365), "overlay"),
+    "ema_20": ("20-bar EMA", lambda p, **_: p.ewm(span=20, adjust=False).mean(), "overlay"),
+    "ema_50": ("50-bar EMA", lambda p, **_: p.ewm(span=50, adjust=False).mean(), "overlay"),
+    "vol_30": ("30d volatility", _volatility, "panel"),
+    "rsi_14": ("14-bar RSI", _rsi, "panel"),
+    "drawdown": ("Drawdown", lambda p, **_: p / p.cummax() - 1, "panel"),
+}
+
+DEFAULT_OVERLAYS = ("sma_7", "sma_30", "sma_365")
+
+
+class IndicatorCube:
+    """
+    Indicator values laid out like the blocks of a `PriceMatrix`.
+
+    `values[block][name]` is a column-major float32 array (dates x tickers)
+    aligned with `prices.blocks[block]`.
+    """
+
+    def __init__(self, prices, values):
+        self.prices = prices
+        self.values = values
+
+    @classmethod
+    def compute(cls, prices, names=tuple(INDICATORS)):
+        """
+        Compute indicators for every ticker of a `PriceMatrix`.
+
+        Args:
+            prices (PriceMatrix): Price blocks.
+            names (tuple): Indicators to compute, keys of `INDICATORS`.
+
+        Returns:
+            IndicatorCube
+        """
+        values = {}
+        for block_name, block in prices.blocks.items():
+            frame = pd.DataFrame(block.values, index=block.dates, dtype="float64")
+            periods = PERIODS_PER_YEAR.get(block_name, 252)
+            values[block_name] = {
+                name: np.asfortranarray(
+                    INDICATORS[name][1](frame, periods_per_year=periods).to_numpy(dtype=np.float32))
+                for name in names
+            }
+        return cls(prices, values)
+
+    @property
+    def names(self):
+        return list(next(iter(self.values.values()), {}))
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for block in self.values.values() for a in block.values())
+
+    def frame(self, ticker, names=None):
+        """
+        Indicators of one ticker over its full history.
+
+        Args:
+            ticker (str): Ticker to slice.
+            names (list): Indicators to include, all by default.
+
+        Returns:
+            pd.DataFrame: Indicator values (dates x indicators).
+        """
+        block_name, j = self.prices.index[ticker]
+        dates = self.prices.blocks[block_name].dates
+        block = self.values[block_name]
+        return pd.DataFrame({name: pd.Series(block[name][:, j], index=dates, copy=False)
+                             for name in (names or self.names)}, copy=False)
+
+    def save(self, directory):
+        """Write every indicator block as a column-major .npy file."""
+        directory = Path(directory)
+        for block_name, block in self.values.items():
+            for name, array in block.items():
+                np.save(directory / f"indicator_{block_name}_{name}.npy", array)
+        (directory / "indicators.json").write_text(json.dumps(self.names))
+
+    @classmethod
+    def load(cls, directory, prices):
+        """Memory-map indicator blocks written by `save`."""
+        directory = Path(directory)
+        names = json.loads((directory / "indicators.json").read_text())
+        values = {block_name: {name: np.load(directory / f"indicator_{block_name}_{name}.npy",
+                                             mmap_mode="r")
+                               for name in names}
+                  for block_name in prices.blocks}
+        return cls(prices, values)
@@ -0,0 +1,212 @@
+import datetime
+import logging
+import os
+import threading
+import warnings
+import numpy as np
+from metrics import REGISTRY, span
+from price_matrix import PriceBlock, PriceMatrix
+from providers import get_provider
+from returns import DEFAULT_HORIZONS, horizon_label, horizon_start
+
+"""
+live.py
+
+Live mode: the latest price of every ticker is polled in one batched call
+every few seconds and written over the last bar of the snapshot's price
+matrix. Only the summary columns derived from the last price (`price_last`,
+the return columns, the all-time and 1Y extremes, `dist_ath`) and the sector
+returns coloring the tree map are updated, from reference prices and
+extremes computed once per snapshot, so each tick costs O(tickers). Longer
+horizons, indicators and risk metrics are refreshed with the next snapshot.
+"""
+
+# Seconds between live price polls; live mode is disabled when 0
+LIVE_INTERVAL = int(os.environ.get("YFH_LIVE_INTERVAL", 0))
+
+
+def _finite(values):
+    return np.where(np.isinf(values), np.nan, values)
+
+
+class LiveSummary:
+    """
+    Live view of one snapshot.
+
+    The price blocks are copied once (snapshots are read-only memory maps)
+    and the history before the last bar is reduced to per-ticker extremes,
+    so `apply` only touches one value per ticker.
+
+    Args:
+        snapshot (Snapshot): Base snapshot.
+    """
+
+    def __init__(self, snapshot):
+        self.base = snapshot
+        summary = snapshot.summary
+        self.blocks = {name: PriceBlock(block.dates, block.tickers,
+                                        np.array(block.values, dtype=np.float32, order="F"))
+                       for name, block in snapshot.prices.blocks.items()}
+        self.prices = PriceMatrix(self.blocks)
+
+        # Summary row -> block column, and the date of the bar being overwritten
+        self.tickers = list(summary.index)
+        self.rows = {name: ([], []) for name in self.blocks}
+        bar_dates = np.full(len(self.tickers), np.datetime64("NaT"), dtype="datetime64[ns]")
+        for i, ticker in enumerate(self.tickers):
+            if ticker in self.prices:
+                name, j = self.prices.index[ticker]
+                self.rows[name][0].append(i)
+                self.rows[name][1].append(j)
+                bar_dates[i] = self.blocks[name].dates[-1].to_datetime64()
+        self.bar_dates = bar_dates
+
+        self.last = summary['price_last'].to_numpy(dtype="float64").copy()
+        self.references = {}
+        for h in DEFAULT_HORIZONS:
+            price_column, return_column = f"price_{horizon_label(h)}", f"{h.lower()}_return"
+            if price_column in summary and return_column in summary:
+                self.references[return_column] = summary[price_column].to_numpy(dtype="float64")
+
+        # Extremes of the history before the last bar; rows without prices keep the summary's
+        self.ath = summary['price_ath'].to_numpy(dtype="float64").copy()
+        self.high_1y = summary['price_1Y_H'].to_numpy(dtype="float64").copy()
+        self.low_1y = summary['prie_1Y_L'].to_numpy(dtype="float64").copy()
+        for name, block in self.blocks.items():
+            rows, columns = self.rows[name]
+            if not rows:
+                continue
+            history = np.asarray(block.values[:-1, columns], dtype="float64")
+            year_row = block.dates.searchsorted(horizon_start(block.dates[-1], "1y"), side="right")
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.ath[rows] = np.nanmax(history, axis=0, initial=-np.inf)
+                self.high_1y[rows] = np.nanmax(history[year_row:], axis=0, initial=-np.inf)
+                self.low_1y[rows] = np.nanmin(history[year_row:], axis=0, initial=np.inf)
+
+    def apply(self, quotes, now=None):
+        """
+        Overwrite the last bar with live prices and derive the live snapshot.
+
+        Prices dated after a ticker's last bar belong to a new session and
+        are left for the next snapshot, which appends that bar.
+
+        Args:
+            quotes (dict): ticker -> (price, session date), see
+                `MarketDataProvider.last_prices`.
+            now (datetime.datetime): Time of the tick, defaults to now (UTC).
+
+        Returns:
+            Snapshot: The base snapshot with live prices, summary and sectors,
+                and `live_dt` set to the tick time.
+        """
+        quoted = [quotes.get(t) for t in self.tickers]
+        price = np.array([np.nan if q is None else q[0] for q in quoted], dtype="float64")
+        dates = np.array([np.datetime64("NaT") if q is None else q[1].to_datetime64()
+                          for q in quoted], dtype="datetime64[ns]")
+        accepted = np.isfinite(price) & (dates == self.bar_dates)
+        new_session = np.isfinite(price) & (dates > self.bar_dates)
+        REGISTRY.inc("yfh_live_quotes_total", int(accepted.sum()), outcome="applied")
+        REGISTRY.inc("yfh_live_quotes_total", int(new_session.sum()), outcome="new_session")
+        REGISTRY.inc("yfh_live_quotes_total", int((~accepted & ~new_session).sum()),
+                     outcome="skipped")
+
+        # A new array per tick: earlier live summaries keep their values
+        last = self.last = np.where(accepted, price, self.last)
+        for name, (rows, columns) in self.rows.items():
+            rows, columns = np.asarray(rows, dtype=int), np.asarray(columns, dtype=int)
+            keep = accepted[rows]
+            self.blocks[name].values[-1, columns[keep]] = price[rows[keep]]
+
+        summary = self.base.summary.copy()
+        summary['price_last'] = last
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for column, reference in self.references.items():
+                summary[column] = last / reference - 1
+            # Infinite bounds mark tickers without history before the last bar
+            ath = _finite(np.fmax(self.ath, last))
+            summary['price_ath'] = ath
+            summary['price_1Y_H'] = _finite(np.fmax(self.high_1y, last))
+            summary['prie_1Y_L'] = _finite(np.fmin(self.low_1y, last))
+            summary['dist_ath'] = last / ath - 1
+
+        sectors = self.base.sectors.with_returns(summary) if self.base.sectors is not None \
+            else None
+        return self.base._replace(prices=self.prices, summary=summary, sectors=sectors,
+                                  live_dt=now or datetime.datetime.now(tz=datetime.timezone.utc))
+
+
+class LiveFeed:
+    """
+    Polls live prices in the background and serves the latest live snapshot.
+
+    Args:
+        source (callable): Returns the current base snapshot, or None.
+        provider (MarketDataProvider): Price source, defaults to the configured one.
+        interval (int): Seconds between polls.
+    """
+
+    def __init__(self, source, provider=None, interval=LIVE_INTERVAL):
+        self.source = source
+        self.provider = provider or get_provider()
+        self.interval = interval
+        self._live = None
+        self._snapshot = (None, None)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the polling thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self):
+        """
+        Latest live snapshot, or the base snapshot until its first tick.
+
+        Returns:
+            Snapshot, or None if no base snapshot is available yet.
+        """
+        base = self.source()
+        # (base, live snapshot) swapped as one reference by the polling thread
+        live_base, snapshot = self._snapshot
+        return snapshot if base is not None and live_base is base else base
+
+    def tick(self):
+        """
+        Poll live prices once and update the live snapshot.
+
+        Returns:
+            bool: Whether the live snapshot was updated.
+        """
+        base = self.source()
+        if base is None:
+            return False
+        with span("live_tick", tickers=len(base.summary)) as fields:
+            if self._live is None or self._live.base is not base:
+                self._live = LiveSummary(base)
+            try:
+                quotes = self.provider.last_prices(self._live.tickers)
+            except Exception as e:
+                logging.warning(f"Live price poll failed: {e}")
+                REGISTRY.inc("yfh_live_ticks_total", outcome="failure")
+                fields.update(quotes=0)
+                return False
+            self._snapshot = (base, self._live.apply(quotes))
+            fields.update(quotes=len(quotes))
+        REGISTRY.inc("yfh_live_ticks_total", outcome="success")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                logging.exception("Live tick failed")
+                REGISTRY.inc("yfh_live_ticks_total", outcome="failure")
+            self._stop.wait(self.interval)
@@ -0,0 +1,290 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from price_store import _write_atomically
+
+"""
+metrics.py
+
+In-process instrumentation of the data pipeline: counters, gauges and
+histograms, timing spans around pipeline stages and cache hit/miss tracking.
+Every span and notable event is also written as one JSON object per line on
+the `yfh.metrics` logger, and the registry can be exported in Prometheus
+text format to a file or served on a local HTTP endpoint.
+"""
+
+# Prometheus text export, written after every published snapshot when set
+METRICS_FILE = os.environ.get("YFH_METRICS_FILE")
+
+# Local port serving /metrics, disabled when 0
+METRICS_PORT = int(os.environ.get("YFH_METRICS_PORT", 0))
+
+# Show the diagnostics panel in the dashboard sidebar
+ADMIN_PANEL = os.environ.get("YFH_ADMIN_PANEL", "0") == "1"
+
+# Histogram buckets (seconds) for upstream calls and pipeline stages
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# name -> (type, help) of every exported metric
+METRICS = {
+    "yfh_stage_seconds": ("histogram", "Duration of pipeline stages."),
+    "yfh_stage_last_seconds": ("gauge", "Duration of the last run of each pipeline stage."),
+    "yfh_fetch_seconds": ("histogram", "Latency of individual upstream calls."),
+    "yfh_fetch_items_total": ("counter", "Items fetched by outcome."),
+    "yfh_fetch_retries_total": ("counter", "Retried upstream calls."),
+    "yfh_fundamentals_cache_total": ("counter", "Fundamentals served by cache status."),
+    "yfh_cache_hits_total": ("counter", "Cached function calls served from the cache."),
+    "yfh_cache_misses_total": ("counter", "Cached function calls that ran the function."),
+    "yfh_snapshot_bytes": ("gauge", "In-memory size of the last built snapshot by part."),
+    "yfh_snapshot_disk_bytes": ("gauge", "On-disk size of the last published snapshot."),
+    "yfh_refresh_total": ("counter", "Snapshot refreshes by outcome."),
+    "yfh_live_ticks_total": ("counter", "Live price polls by outcome."),
+    "yfh_live_quotes_total": ("counter", "Live prices by outcome."),
+}
+
+# JSON event lines; entry points attach a handler with `configure_event_logging`
+event_logger = logging.getLogger("yfh.metrics")
+
+
+def configure_event_logging(stream=None):
+    """
+    Write the JSON event lines unformatted to `stream` (stderr by default).
+
+    Called by the entry points rather than at import, so importing the
+    pipeline leaves the host application's logging untouched. Calling it
+    again has no effect.
+
+    Args:
+        stream: File-like object to write to.
+    """
+    if event_logger.handlers:
+        return
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    event_logger.addHandler(handler)
+    event_logger.setLevel(logging.INFO)
+    event_logger.propagate = False
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Registry:
+    """Thread-safe store of counters, gauges and histograms keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0}
+            histogram["counts"][bisect.bisect_left(histogram["buckets"], value)] += 1
+            histogram["sum"] += value
+
+    def samples(self):
+        """
+        Current values as rows, histograms summarized by sum, count and mean.
+
+        Returns:
+            list[dict]: name, labels, value (and count/mean for histograms).
+        """
+        with self._lock:
+            rows = [{"name": n, "labels": dict(l), "value": v}
+                    for (n, l), v in {**self._counters, **self._gauges}.items()]
+            for (n, l), h in self._histograms.items():
+                count = sum(h["counts"])
+                rows.append({"name": n, "labels": dict(l), "value": h["sum"],
+                             "count": count, "mean": h["sum"] / count if count else None})
+        return sorted(rows, key=lambda r: (r["name"], sorted(r["labels"].items())))
+
+    def prometheus_text(self):
+        """All metrics in Prometheus text exposition format."""
+        with self._lock:
+            series = {}
+            for (n, l), v in list(self._counters.items()) + list(self._gauges.items()):
+                series.setdefault(n, []).append((l, [f"{n}{_format_labels(l)} {v}"]))
+            for (n, l), h in self._histograms.items():
+                lines, cumulative = [], 0
+                for bound, count in zip(list(h["buckets"]) + ["+Inf"], h["counts"]):
+                    cumulative += count
+                    lines.append(f"{n}_bucket{_format_labels(l, [('le', bound)])} {cumulative}")
+                lines.append(f"{n}_sum{_format_labels(l)} {h['sum']}")
+                lines.append(f"{n}_count{_format_labels(l)} {cumulative}")
+                series.setdefault(n, []).append((l, lines))
+        out = []
+        for name in sorted(series):
+            kind, help_text = METRICS.get(name, ("untyped", ""))
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for _, lines in sorted(series[name], key=lambda item: item[0]):
+                out += lines
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+# Callables receiving every logged event as (event, fields)
+_listeners = []
+
+
+def add_listener(callback):
+    """Call `callback(event, fields)` for every event logged from now on."""
+    _listeners.append(callback)
+
+
+def log_event(event, **fields):
+    """Write one structured JSON log line and notify listeners."""
+    event_logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields},
+                                 default=str))
+    for callback in list(_listeners):
+        callback(event, fields)
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Time a pipeline stage, recording its duration and logging it as JSON.
+
+    Args:
+        stage (str): Stage name, used as the `stage` label.
+        **fields: Extra fields for the log line.
+
+    Yields:
+        dict: `fields`, which the stage can extend (e.g. row counts).
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield fields
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        REGISTRY.observe("yfh_stage_seconds", seconds, STAGE_BUCKETS, stage=stage)
+        REGISTRY.set("yfh_stage_last_seconds", seconds, stage=stage)
+        log_event("stage", stage=stage, seconds=round(seconds, 4), outcome=outcome, **fields)
+
+
+_cache_state = threading.local()
+
+
+def track_cache(cache_decorator, name=None):
+    """
+    Apply a caching decorator (e.g. `st.cache_data()`) and count its hits and misses.
+
+    A call is a miss when the wrapped function body runs, a hit otherwise.
+
+    Args:
+        cache_decorator (callable): Decorator turning a function into its cached version.
+        name (str): `cache` label, defaults to the function name.
+
+    Returns:
+        callable: Decorator.
+    """
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            _cache_state.missed = True
+            return fn(*args, **kwargs)
+
+        cached = cache_decorator(body)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            _cache_state.missed = False
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                outcome = "misses" if _cache_state.missed else "hits"
+                REGISTRY.inc(f"yfh_cache_{outcome}_total", cache=label)
+
+        call.clear = getattr(cached, "clear", None)
+        return call
+    return decorate
+
+
+def export(path=METRICS_FILE):
+    """Write the Prometheus text export to `path`, atomically; no-op when unset."""
+    if not path:
+        return
+    # Several processes (CLI, app producer) may export to the same file
+    text = REGISTRY.prometheus_text()
+    _write_atomically(Path(path), lambda tmp: Path(tmp).write_text(text))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+
+
+def serve(port=METRICS_PORT, host="127.0.0.1"):
+    """
+    Serve /metrics on a local port from a daemon thread, once per process.
+
+    Args:
+        port (int): Port to listen on; 0 disables the endpoint.
+        host (str): Interface to bind.
+
+    Returns:
+        ThreadingHTTPServer, or None if disabled or the port is taken
+            (e.g. by another app process on the same host).
+    """
+    global _server
+    if _server is not None or not port:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return _server
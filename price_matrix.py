@@ -0,0 +1,139 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+"""
+price_matrix.py
+
+Compact price container. Each asset class is a float32 block on its own
+calendar (5-day equities, 7-day crypto) instead of one float64 frame on the
+union calendar with forward-filled weekend rows. Single-ticker access is a
+zero-copy view; calendars are only aligned when a view mixes asset classes.
+"""
+
+
+@dataclass
+class PriceBlock:
+    """Prices of one asset class: `values[i, j]` is the close of `tickers[j]` on `dates[i]`."""
+    dates: pd.DatetimeIndex
+    tickers: list
+    values: np.ndarray
+
+
+class PriceMatrix:
+    """
+    Per-asset-class float32 price blocks with a ticker -> (block, column) index.
+
+    Blocks are stored column-major so every ticker's history is contiguous.
+    Indexing mirrors a DataFrame: `matrix[ticker]` is a Series view and
+    `matrix[[tickers]]` a DataFrame.
+    """
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.index = {t: (name, j) for name, block in blocks.items()
+                      for j, t in enumerate(block.tickers)}
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        Build blocks from wide close-price frames.
+
+        Args:
+            frames (dict): asset class -> DataFrame (dates x tickers). Gaps
+                within a block are forward-filled on its own calendar.
+
+        Returns:
+            PriceMatrix
+        """
+        blocks = {}
+        for name, frame in frames.items():
+            if frame.empty:
+                continue
+            values = np.asfortranarray(frame.ffill().to_numpy(dtype=np.float32))
+            blocks[name] = PriceBlock(pd.DatetimeIndex(frame.index), list(frame.columns), values)
+        return cls(blocks)
+
+    @property
+    def tickers(self):
+        return list(self.index)
+
+    @property
+    def nbytes(self):
+        return sum(block.values.nbytes for block in self.blocks.values())
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return self.frame(key)
+
+    def column(self, ticker):
+        """
+        Full history of one ticker on its asset-class calendar.
+
+        Returns:
+            pd.Series: Zero-copy view on the block.
+        """
+        name, j = self.index[ticker]
+        block = self.blocks[name]
+        return pd.Series(block.values[:, j], index=block.dates, name=ticker, copy=False)
+
+    def frame(self, tickers):
+        """
+        Prices of several tickers as a DataFrame.
+
+        Tickers of a single asset class keep that class' calendar. Mixed
+        views are aligned on the union calendar and forward-filled.
+
+        Args:
+            tickers (list): Tickers to select.
+
+        Returns:
+            pd.DataFrame: Prices (dates x tickers), float32.
+        """
+        tickers = list(tickers)
+        by_block = {}
+        for ticker in tickers:
+            name, j = self.index[ticker]
+            by_block.setdefault(name, []).append(j)
+        if not by_block:
+            return pd.DataFrame(columns=tickers, dtype=np.float32)
+        frames = []
+        for name, columns in by_block.items():
+            block = self.blocks[name]
+            frames.append(pd.DataFrame(block.values[:, columns], index=block.dates,
+                                       columns=[block.tickers[j] for j in columns]))
+        if len(frames) == 1:
+            return frames[0][tickers]
+        dates = frames[0].index
+        for frame in frames[1:]:
+            dates = dates.union(frame.index)
+        aligned = pd.concat([f.reindex(dates) for f in frames], axis=1).ffill()
+        return aligned[tickers]
+
+    def save(self, directory):
+        """Write every block as a column-major .npy file plus a JSON index."""
+        directory = Path(directory)
+        layout = {}
+        for name, block in self.blocks.items():
+            np.save(directory / f"prices_{name}.npy", block.values)
+            np.save(directory / f"dates_{name}.npy", block.dates.values)
+            layout[name] = block.tickers
+        (directory / "prices.json").write_text(json.dumps(layout))
+
+    @classmethod
+    def load(cls, directory):
+        """Memory-map blocks written by `save`; values are read-only views on the files."""
+        directory = Path(directory)
+        layout = json.loads((directory / "prices.json").read_text())
+        blocks = {}
+        for name, tickers in layout.items():
+            values = np.load(directory / f"prices_{name}.npy", mmap_mode="r")
+            dates = pd.DatetimeIndex(np.load(directory / f"dates_{name}.npy"))
+            blocks[name] = PriceBlock(dates, tickers, values)
+        return cls(blocks)
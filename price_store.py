@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: index updates are only serialized within the process
+    fcntl = None
+
+"""
+price_store.py
+
+Persistent on-disk store of daily close prices. Histories are kept as one
+Parquet file per ticker, partitioned by asset class, so that a refresh only
+needs to download the bars after each ticker's last stored date.
+"""
+
+# Root directory of the local data store, overridable through the environment
+DATA_DIR = os.environ.get("YFH_DATA_DIR", ".yfh_data")
+
+_index_lock = threading.Lock()
+
+
+def _write_atomically(path, write):
+    """Call `write(tmp_path)` on a unique temporary file, then rename it to `path`."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class PriceStore:
+    """
+    Daily close prices stored under `<root>/prices/<asset_class>/<ticker>.parquet`.
+
+    A small JSON index per asset class keeps the last stored date of every
+    ticker so refresh planning does not need to open any Parquet file.
+
+    Several processes may write at once (the snapshot producer and Single
+    Symbol sessions): files are written through unique temporary files and
+    index updates are serialized with a lock file.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root or DATA_DIR) / "prices"
+
+    def _dir(self, asset_class):
+        return self.root / asset_class
+
+    def _path(self, asset_class, ticker):
+        return self._dir(asset_class) / f"{ticker}.parquet"
+
+    def _index_path(self, asset_class):
+        return self._dir(asset_class) / "_index.json"
+
+    def _load_index(self, asset_class):
+        path = self._index_path(asset_class)
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text())
+        except ValueError as e:
+            logging.warning(f"Corrupted price index {path}, rebuilding: {e}")
+            return {}
+
+    def _save_index(self, asset_class, index):
+        _write_atomically(self._index_path(asset_class),
+                          lambda tmp: Path(tmp).write_text(json.dumps(index, sort_keys=True)))
+
+    @contextmanager
+    def _locked_index(self, asset_class):
+        with _index_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._dir(asset_class) / "_index.lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _update_index(self, asset_class, entries):
+        """Merge `entries` into the index, re-reading it under the lock."""
+        with self._locked_index(asset_class):
+            index = self._load_index(asset_class)
+            index.update(entries)
+            self._save_index(asset_class, index)
+
+    def last_dates(self, asset_class, tickers):
+        """
+        Last stored date of each ticker.
+
+        Args:
+            asset_class (str): Partition name, e.g. 'equity' or 'crypto'.
+            tickers (list): Tickers to look up.
+
+        Returns:
+            dict: ticker -> pd.Timestamp, or None if the ticker is not stored.
+        """
+        index = self._load_index(asset_class)
+        return {t: pd.Timestamp(index[t]) if t in index and self._path(asset_class, t).exists()
+                else None for t in tickers}
+
+    def write(self, asset_class, close):
+        """
+        Merge freshly downloaded bars into the store.
+
+        Bars overlapping the stored history replace the stored values, which
+        lets the last (possibly intraday) bar be corrected on the next refresh.
+
+        Args:
+            asset_class (str): Partition name.
+            close (pd.DataFrame): Wide frame of close prices (dates x tickers).
+        """
+        if close is None or close.empty:
+            return
+        directory = self._dir(asset_class)
+        directory.mkdir(parents=True, exist_ok=True)
+        written = {}
+        for ticker in close.columns:
+            new = close[ticker].dropna()
+            if new.empty:
+                continue
+            path = self._path(asset_class, ticker)
+            if path.exists():
+                old = pd.read_parquet(path)["Close"]
+                new = new.combine_first(old)
+            new = new.sort_index().rename("Close").to_frame()
+            new.index.name = "Date"
+            # Write then rename so an interrupted refresh never leaves a truncated file
+            _write_atomically(path, new.to_parquet)
+            written[ticker] = new.index[-1].isoformat()
+        if written:
+            self._update_index(asset_class, written)
+
+    def read(self, asset_class, tickers):
+        """
+        Rebuild a wide close-price frame from local storage.
+
+        Args:
+            asset_class (str): Partition name.
+            tickers (list): Tickers to load; missing ones are skipped.
+
+        Returns:
+            pd.DataFrame: Close prices (dates x tickers).
+        """
+        series = {}
+        for ticker in tickers:
+            path = self._path(asset_class, ticker)
+            if path.exists():
+                series[ticker] = pd.read_parquet(path)["Close"]
+        if not series:
+            return pd.DataFrame()
+        return pd.DataFrame(series).sort_index()
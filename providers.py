@@ -0,0 +1,333 @@
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+"""
+providers.py
+
+Market-data provider layer. The pipeline in data.py only talks to a
+`MarketDataProvider`, which covers the three upstream calls it needs:
+the most-active screener, bulk daily history and per-ticker fundamentals.
+
+`YahooProvider` wraps yfinance/yahooquery, imported on first use so the
+pipeline can be imported without them. `FixtureProvider` is an offline,
+deterministic backend replaying recorded or synthetic data with simulated
+latency and failures, for profiling and load testing without network.
+"""
+
+# Quote-endpoint fields mapped to their `Ticker.info` names
+QUOTE_FIELDS = {
+    "regularMarketVolume": "volume",
+    "averageDailyVolume3Month": "averageVolume",
+    "marketCap": "marketCap",
+    "trailingPE": "trailingPE",
+    "forwardPE": "forwardPE",
+}
+
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Consumer Cyclical",
+           "Industrials", "Communication Services", "Consumer Defensive",
+           "Energy", "Utilities", "Real Estate", "Basic Materials"]
+
+
+class ProviderError(Exception):
+    """Raised when a provider fails to serve a request."""
+
+
+class MarketDataProvider:
+    """Interface of the upstream market-data calls used by the pipeline."""
+
+    # Concurrent `history` calls the backend supports, None for no limit
+    history_concurrency = None
+
+    def most_active(self, count=50):
+        """
+        Args:
+            count (int): Number of tickers to return.
+
+        Returns:
+            list: Symbols of the most active stocks.
+        """
+        raise NotImplementedError
+
+    def history(self, tickers, start):
+        """
+        Args:
+            tickers (list): Tickers to download.
+            start (str): First date (inclusive), 'YYYY-MM-DD'.
+
+        Returns:
+            pd.DataFrame: Daily close prices (dates x tickers).
+        """
+        raise NotImplementedError
+
+    def info(self, ticker):
+        """
+        Args:
+            ticker (str): Ticker to look up.
+
+        Returns:
+            dict: Raw fundamentals, keyed like yfinance's `Ticker.info`.
+        """
+        raise NotImplementedError
+
+    def quotes(self, tickers):
+        """
+        Fast-moving market fields for many tickers in one batched call.
+
+        Args:
+            tickers (list): Tickers to quote.
+
+        Returns:
+            dict: ticker -> dict of `QUOTE_FIELDS` values, keyed like `Ticker.info`.
+        """
+        raise NotImplementedError
+
+    def last_prices(self, tickers):
+        """
+        Latest trade price of many tickers in one batched call.
+
+        Args:
+            tickers (list): Tickers to quote.
+
+        Returns:
+            dict: ticker -> (price, session date as a tz-naive pd.Timestamp);
+                tickers without a quote are left out.
+        """
+        raise NotImplementedError
+
+
+class YahooProvider(MarketDataProvider):
+    """Live Yahoo Finance data through yahooquery and yfinance."""
+
+    # yf.download keeps per-call state in module globals and is not reentrant;
+    # it already downloads the tickers of one call on parallel threads, so
+    # chunks are requested one at a time instead of from a pool.
+    history_concurrency = 1
+    _download_lock = threading.Lock()
+
+    def most_active(self, count=50):
+        from yahooquery import Screener
+        data = Screener().get_screeners('most_actives', count=count)
+        return [item['symbol'] for item in data['most_actives']['quotes']]
+
+    def history(self, tickers, start):
+        import yfinance as yf
+        with self._download_lock:
+            return yf.download(tickers, start=start, progress=False)["Close"]
+
+    def info(self, ticker):
+        import yfinance as yf
+        return yf.Ticker(ticker).info
+
+    def quotes(self, tickers):
+        from yahooquery import Ticker
+        data = Ticker(tickers).quotes
+        if not isinstance(data, dict):
+            raise ProviderError(f"Quote request failed: {data}")
+        return {t: {name: quote.get(field) for field, name in QUOTE_FIELDS.items()}
+                for t, quote in data.items()}
+
+    def last_prices(self, tickers):
+        from yahooquery import Ticker
+        data = Ticker(tickers).quotes
+        if not isinstance(data, dict):
+            raise ProviderError(f"Quote request failed: {data}")
+        prices = {}
+        for t, quote in data.items():
+            price, traded = quote.get("regularMarketPrice"), quote.get("regularMarketTime")
+            if price is None or traded is None:
+                continue
+            traded = pd.Timestamp(traded, unit="s", tz="UTC") if isinstance(traded, (int, float)) \
+                else pd.Timestamp(traded, tz="UTC")
+            # Daily bars are dated in the exchange's timezone
+            traded = traded.tz_convert(quote.get("exchangeTimezoneName") or "UTC")
+            prices[t] = (float(price), traded.tz_localize(None).normalize())
+        return prices
+
+
+class FixtureProvider(MarketDataProvider):
+    """
+    Deterministic offline provider.
+
+    Data is replayed from `fixture_dir` when present (see `record_fixtures`)
+    and otherwise synthesized from a per-ticker seed, so the same ticker
+    always gets the same history and fundamentals. Every call sleeps for
+    `latency` seconds and fails with probability `failure_rate`.
+
+    `last_prices` is a simulated live feed: each call moves every ticker's
+    price by a seeded random step away from its last close, on the date of
+    its last bar.
+    """
+
+    def __init__(self, fixture_dir=None, latency=0.0, failure_rate=0.0,
+                 seed=0, end=None):
+        self.fixture_dir = Path(fixture_dir) if fixture_dir else None
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+        self._rng = random.Random(seed)
+        # Generate from a fixed epoch so overlapping windows always agree
+        self._calendars = {
+            "crypto": pd.date_range("2010-01-01", self.end, freq="D"),
+            "equity": pd.date_range("2010-01-01", self.end, freq="B"),
+        }
+        self._recorded_history = None
+        self._recorded_info = None
+        self._recorded_most_active = None
+        self._live_prices = {}
+        self._ticks = 0
+        if self.fixture_dir is not None:
+            self._load_fixtures()
+
+    def _load_fixtures(self):
+        history_path = self.fixture_dir / "history.parquet"
+        info_path = self.fixture_dir / "info.json"
+        most_active_path = self.fixture_dir / "most_actives.json"
+        if history_path.exists():
+            self._recorded_history = pd.read_parquet(history_path)
+        if info_path.exists():
+            self._recorded_info = json.loads(info_path.read_text())
+        if most_active_path.exists():
+            self._recorded_most_active = json.loads(most_active_path.read_text())
+
+    def _simulate_call(self, what):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ProviderError(f"Simulated failure for {what}")
+
+    def _ticker_seed(self, ticker):
+        return zlib.crc32(ticker.encode()) ^ self.seed
+
+    def _synthetic_history(self, ticker):
+        dates = self._calendars["crypto" if ticker.endswith("-USD") else "equity"]
+        rng = np.random.default_rng(self._ticker_seed(ticker))
+        log_returns = rng.normal(0.0003, 0.02, len(dates))
+        prices = rng.uniform(10, 500) * np.exp(np.cumsum(log_returns))
+        return pd.Series(prices, index=dates, name=ticker)
+
+    def most_active(self, count=50):
+        self._simulate_call("most_actives")
+        if self._recorded_most_active is not None:
+            return self._recorded_most_active[:count]
+        return [f"SYN{i:03d}" for i in range(count)]
+
+    def history(self, tickers, start):
+        self._simulate_call(f"history of {len(tickers)} tickers")
+        series = {}
+        for ticker in tickers:
+            if self._recorded_history is not None and ticker in self._recorded_history:
+                series[ticker] = self._recorded_history[ticker].dropna()
+            else:
+                series[ticker] = self._synthetic_history(ticker)
+        close = pd.DataFrame(series)
+        return close[close.index >= pd.Timestamp(start)]
+
+    def _info(self, ticker):
+        if self._recorded_info is not None and ticker in self._recorded_info:
+            return self._recorded_info[ticker]
+        rng = np.random.default_rng(self._ticker_seed(ticker))
+        info = {"symbol": ticker, "shortName": f"{ticker} Synthetic"}
+        if ticker.endswith("-USD"):
+            info.update(marketCap=int(rng.uniform(1e9, 1e12)),
+                        volume=int(rng.uniform(1e7, 1e10)))
+            return info
+        eps = rng.uniform(0.5, 15)
+        price = self._synthetic_history(ticker).iloc[-1]
+        info.update(
+            sector=SECTORS[rng.integers(len(SECTORS))],
+            trailingPE=price / eps,
+            forwardPE=price / (eps * rng.uniform(0.9, 1.3)),
+            totalRevenue=int(rng.uniform(1e9, 4e11)),
+            dividendYield=rng.uniform(0, 0.05),
+            fiveYearAvgDividendYield=rng.uniform(0, 5),
+            payoutRatio=rng.uniform(0, 0.8),
+            beta=rng.uniform(0.5, 2),
+            volume=int(rng.uniform(1e6, 1e8)),
+            averageVolume=int(rng.uniform(1e6, 1e8)),
+            marketCap=int(rng.uniform(1e10, 3e12)),
+            shortPercentOfFloat=rng.uniform(0, 0.1),
+            bookValue=rng.uniform(1, 100),
+            trailingEps=eps,
+            forwardEps=eps * rng.uniform(0.9, 1.3),
+            debtToEquity=rng.uniform(0, 200),
+        )
+        return info
+
+    def info(self, ticker):
+        self._simulate_call(ticker)
+        return self._info(ticker)
+
+    def quotes(self, tickers):
+        self._simulate_call(f"quotes of {len(tickers)} tickers")
+        fields = set(QUOTE_FIELDS.values())
+        return {t: {k: v for k, v in self._info(t).items() if k in fields}
+                for t in tickers}
+
+    def _last_bar(self, ticker):
+        if self._recorded_history is not None and ticker in self._recorded_history:
+            history = self._recorded_history[ticker].dropna()
+        else:
+            history = self._synthetic_history(ticker)
+        return float(history.iloc[-1]), history.index[-1]
+
+    def last_prices(self, tickers):
+        self._simulate_call(f"last prices of {len(tickers)} tickers")
+        self._ticks += 1
+        prices = {}
+        for ticker in tickers:
+            if ticker not in self._live_prices:
+                self._live_prices[ticker] = self._last_bar(ticker)
+            price, date = self._live_prices[ticker]
+            rng = np.random.default_rng([self._ticker_seed(ticker), self._ticks])
+            price *= float(np.exp(rng.normal(0.0, 0.002)))
+            self._live_prices[ticker] = prices[ticker] = (price, date)
+        return prices
+
+
+def record_fixtures(provider, tickers, start, fixture_dir):
+    """
+    Record live provider responses so `FixtureProvider` can replay them.
+
+    Args:
+        provider (MarketDataProvider): Source provider, usually `YahooProvider`.
+        tickers (list): Tickers to record history and fundamentals for.
+        start (str): First date of recorded history.
+        fixture_dir (str): Output directory.
+    """
+    fixture_dir = Path(fixture_dir)
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    (fixture_dir / "most_actives.json").write_text(json.dumps(provider.most_active()))
+    provider.history(tickers, start).to_parquet(fixture_dir / "history.parquet")
+    info = {t: provider.info(t) for t in tickers}
+    (fixture_dir / "info.json").write_text(json.dumps(info, default=str))
+
+
+def get_provider():
+    """
+    Build the provider selected by the environment.
+
+    `YFH_PROVIDER` is 'yahoo' (default) or 'fixture'. The fixture backend is
+    configured with `YFH_FIXTURE_DIR`, `YFH_FIXTURE_LATENCY` (seconds per
+    call) and `YFH_FIXTURE_FAILURE_RATE` (probability in [0, 1]).
+
+    Returns:
+        MarketDataProvider
+    """
+    name = os.environ.get("YFH_PROVIDER", "yahoo")
+    if name == "yahoo":
+        return YahooProvider()
+    if name == "fixture":
+        return FixtureProvider(
+            fixture_dir=os.environ.get("YFH_FIXTURE_DIR"),
+            latency=float(os.environ.get("YFH_FIXTURE_LATENCY", 0)),
+            failure_rate=float(os.environ.get("YFH_FIXTURE_FAILURE_RATE", 0)),
+        )
+    raise ValueError(f"Unknown market-data provider: {name}")
@@ -0,0 +1,97 @@
+import logging
+import os
+import threading
+import time
+from metrics import REGISTRY
+
+"""
+refresh.py
+
+Background refresh of the dashboard snapshot. A daemon thread rebuilds the
+snapshot shortly before each interval boundary (by default a few minutes
+before the hour) while readers keep getting the previous one; the new
+snapshot is swapped in with a single reference assignment when complete.
+"""
+
+# Seconds between refreshes, and how long before each boundary to start
+REFRESH_INTERVAL = int(os.environ.get("YFH_REFRESH_INTERVAL", 3600))
+REFRESH_LEAD = int(os.environ.get("YFH_REFRESH_LEAD", 300))
+
+# Whether dashboard processes rebuild snapshots themselves; disable when
+# snapshots are published by `build_snapshot_cli.py` (e.g. from cron)
+APP_REFRESH = os.environ.get("YFH_APP_REFRESH", "1") == "1"
+
+
+class SnapshotRefresher:
+    """
+    Keeps the latest snapshot built by `build` and refreshes it in the background.
+
+    Args:
+        build (callable): Builds and returns a new snapshot.
+        interval (int): Seconds between refreshes, aligned to multiples of
+            `interval` since the epoch (i.e. on the hour for 3600).
+        lead (int): Seconds before each boundary to start the rebuild.
+        retry_delay (int): Seconds to wait after a failed rebuild.
+    """
+
+    def __init__(self, build, interval=REFRESH_INTERVAL, lead=REFRESH_LEAD, retry_delay=60):
+        self.build = build
+        self.interval = interval
+        self.lead = min(lead, interval)
+        self.retry_delay = retry_delay
+        self._snapshot = None
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the refresh thread; the first snapshot is built immediately."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="snapshot-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def get(self, timeout=None):
+        """
+        Latest snapshot, waiting for the first build if none is available yet.
+
+        Args:
+            timeout (float): Seconds to wait for the first build.
+
+        Returns:
+            The latest snapshot, or None if the first build has not finished.
+        """
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def refresh_now(self):
+        """Trigger a rebuild without waiting for the next boundary."""
+        self._wake.set()
+
+    def next_run(self, now):
+        """Epoch time of the next scheduled rebuild after `now`."""
+        boundary = (now // self.interval + 1) * self.interval
+        next_run = boundary - self.lead
+        return next_run if next_run > now else next_run + self.interval
+
+    def _refresh(self):
+        started = time.monotonic()
+        try:
+            snapshot = self.build()
+        except Exception:
+            logging.exception("Snapshot refresh failed, keeping the previous snapshot")
+            REGISTRY.inc("yfh_refresh_total", outcome="failure")
+            return False
+        REGISTRY.inc("yfh_refresh_total", outcome="success")
+        self._snapshot = snapshot
+        self._ready.set()
+        logging.info(f"Snapshot refreshed in {time.monotonic() - started:.1f}s")
+        return True
+
+    def _run(self):
+        while True:
+            ok = self._refresh()
+            now = time.time()
+            delay = self.next_run(now) - now if ok else self.retry_delay
+            self._wake.wait(delay)
+            self._wake.clear()
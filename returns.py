@@ -0,0 +1,142 @@
+import re
+import warnings
+import numpy as np
+import pandas as pd
+
+"""
+returns.py
+
+Calendar-aware multi-horizon return engine. Horizons are calendar offsets
+('1w', '3m', 'YTD', ...) resolved against the date index with a single
+`searchsorted`, so '1y' means one calendar year on both the 5-day equity
+calendar and the 7-day crypto calendar.
+"""
+
+DEFAULT_HORIZONS = ("1d", "1w", "MTD", "1m", "3m", "6m", "YTD", "1y", "3y")
+
+_HORIZON_PATTERN = re.compile(r"^(\d+)([dwmy])$")
+_OFFSETS = {"d": "days", "w": "weeks", "m": "months", "y": "years"}
+
+
+def horizon_start(last_date, horizon):
+    """
+    Calendar date a horizon looks back to.
+
+    Args:
+        last_date (pd.Timestamp): Date of the latest price.
+        horizon (str): 'Nd', 'Nw', 'Nm', 'Ny', 'MTD' or 'YTD'.
+
+    Returns:
+        pd.Timestamp: Reference date; the reference price is the last close
+            on or before it.
+    """
+    if horizon == "MTD":
+        return last_date.normalize().replace(day=1) - pd.Timedelta(days=1)
+    if horizon == "YTD":
+        return pd.Timestamp(year=last_date.year - 1, month=12, day=31, tz=last_date.tz)
+    match = _HORIZON_PATTERN.match(horizon)
+    if match is None:
+        raise ValueError(f"Unknown return horizon: {horizon}")
+    n, unit = int(match.group(1)), match.group(2)
+    return last_date - pd.DateOffset(**{_OFFSETS[unit]: n})
+
+
+def horizon_label(horizon):
+    """Column suffix of a horizon, e.g. '1d' -> '1_d', 'YTD' -> 'ytd'."""
+    match = _HORIZON_PATTERN.match(horizon)
+    return f"{match.group(1)}_{match.group(2)}" if match else horizon.lower()
+
+
+class ReturnEngine:
+    """
+    Multi-horizon returns over a price matrix (dates x tickers).
+
+    The matrix is forward-filled once so every reference row holds the last
+    known close of each ticker. Reference rows of all horizons are resolved
+    with one `searchsorted`. Per-horizon columns are memoized on the engine,
+    which lives for one summary build: repeated `table` calls on the same
+    engine reuse them, but nothing is kept across snapshots. An empty matrix
+    (e.g. an asset class that failed to download on a cold start) yields an
+    empty table.
+    """
+
+    def __init__(self, df_prices):
+        self.columns = df_prices.columns
+        self.dates = df_prices.index
+        self.values = df_prices.ffill().to_numpy(dtype="float64")
+        self.last = self.values[-1] if len(self.values) else np.full(len(self.columns), np.nan)
+        self._rows = {}
+        self._columns = {}
+
+    def rows(self, horizons):
+        """
+        Reference row of every horizon, or -1 when history is too short.
+
+        Args:
+            horizons (list): Horizon names.
+
+        Returns:
+            dict: horizon -> row position.
+        """
+        missing = [h for h in horizons if h not in self._rows]
+        if missing and not len(self.dates):
+            self._rows.update((h, -1) for h in missing)
+        elif missing:
+            last_date = self.dates[-1]
+            targets = [horizon_start(last_date, h) for h in missing]
+            positions = self.dates.searchsorted(targets, side="right") - 1
+            self._rows.update(zip(missing, positions))
+        return {h: self._rows[h] for h in horizons}
+
+    def _horizon_columns(self, horizons):
+        rows = self.rows(horizons)
+        missing = [h for h in horizons if h not in self._columns]
+        if missing:
+            valid = np.array([rows[h] >= 0 for h in missing])
+            ref = np.full((len(missing), len(self.columns)), np.nan)
+            ref[valid] = self.values[[rows[h] for h in missing if rows[h] >= 0]]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ret = self.last / ref - 1
+            for i, h in enumerate(missing):
+                self._columns[h] = (ref[i], ret[i])
+        return {h: self._columns[h] for h in horizons}
+
+    def _extremes(self):
+        if "extremes" not in self._columns and not len(self.values):
+            empty = np.full(len(self.columns), np.nan)
+            self._columns["extremes"] = (empty, empty, empty)
+        if "extremes" not in self._columns:
+            year_row = max(self.rows(["1y"])["1y"] + 1, 0)
+            with warnings.catch_warnings():
+                # Tickers without any price in the window yield NaN
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self._columns["extremes"] = (
+                    np.nanmax(self.values, axis=0),
+                    np.nanmax(self.values[year_row:], axis=0),
+                    np.nanmin(self.values[year_row:], axis=0),
+                )
+        return self._columns["extremes"]
+
+    def table(self, horizons=DEFAULT_HORIZONS):
+        """
+        Prices, returns, ATH and 1Y range per ticker.
+
+        Args:
+            horizons (list): Horizon names.
+
+        Returns:
+            pd.DataFrame: One row per ticker with `price_last`, a `price_<h>`
+                and `<h>_return` column per horizon, `price_ath`,
+                `price_1Y_H`, `prie_1Y_L` and `dist_ath`.
+        """
+        horizon_columns = self._horizon_columns(horizons)
+        ath, high_1y, low_1y = self._extremes()
+        data = {"price_last": self.last}
+        for h in horizons:
+            data[f"price_{horizon_label(h)}"] = horizon_columns[h][0]
+        data.update({"price_ath": ath, "price_1Y_H": high_1y, "prie_1Y_L": low_1y})
+        for h in horizons:
+            data[f"{h.lower()}_return"] = horizon_columns[h][1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            data["dist_ath"] = self.last / ath - 1
+        return pd.DataFrame(data, index=self.columns)
@@ -0,0 +1,319 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from indicators import PERIODS_PER_YEAR
+
+"""
+risk.py
+
+Cross-sectional risk analytics over the whole `PriceMatrix`: realized
+volatility, Sharpe-style ratio, current and maximum drawdown, beta against
+benchmark ETFs and the full pairwise correlation matrix.
+
+Window statistics are derived from running sums of daily log returns and
+their cross-product matrix on a common calendar (the equity calendar, with
+other asset classes sampled at its dates). When a refresh only revises the
+latest bar or appends one bar, the sums are updated with low-rank
+corrections instead of being recomputed from the whole window; tickers
+entering or leaving the universe add or drop rows and columns of the
+cross-product matrix. The state is saved with every snapshot so a new
+process (e.g. each cron build) resumes from it.
+"""
+
+# Trading days in the rolling risk window
+RISK_WINDOW = 252
+
+# Benchmarks betas are computed against
+BENCHMARKS = ("SPY", "QQQ")
+
+
+def _sample(block, dates):
+    """Last close of every ticker of `block` on or before each of `dates`."""
+    positions = block.dates.searchsorted(dates, side="right") - 1
+    values = np.asarray(block.values, dtype="float64")[np.maximum(positions, 0)]
+    values[positions < 0] = np.nan
+    return values
+
+
+def _drawdown_state(values):
+    """Running peak and maximum drawdown of `values` (dates x tickers) before its last row."""
+    peak = np.fmax.accumulate(np.nan_to_num(values, nan=-np.inf), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = values / peak - 1
+    return (peak[-2] if len(values) > 1 else np.full(values.shape[1], -np.inf),
+            np.nanmin(np.vstack([np.zeros(values.shape[1]), dd[:-1]]), axis=0))
+
+
+class RiskEngine:
+    """
+    Risk metrics of a `PriceMatrix`, updated incrementally between refreshes.
+
+    Missing returns (before listing, after delisting) count as zero returns
+    in the window statistics. Updates replace the state instead of
+    modifying it, so `copy` is cheap and copies are not affected by later
+    updates.
+
+    Args:
+        window (int): Rows of the rolling return window.
+        benchmarks (tuple): Tickers to compute betas against.
+    """
+
+    def __init__(self, window=RISK_WINDOW, benchmarks=BENCHMARKS):
+        self.window = window
+        self.benchmarks = benchmarks
+        self._state = None
+        # Whether the last update was incremental
+        self.incremental = False
+
+    def _calendar(self, prices):
+        name = "equity" if "equity" in prices.blocks else next(iter(prices.blocks))
+        return name, prices.blocks[name].dates
+
+    def _window_returns(self, prices, dates):
+        """Log returns between consecutive `dates`, tickers in `prices.tickers` order."""
+        levels = np.hstack([_sample(block, dates) for block in prices.blocks.values()])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(levels), axis=0)
+        return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def _full(self, prices):
+        calendar_name, calendar = self._calendar(prices)
+        dates = calendar[-(self.window + 1):]
+        returns = self._window_returns(prices, dates)
+        drawdown = {}
+        for name, block in prices.blocks.items():
+            peak, mdd = _drawdown_state(np.asarray(block.values, dtype="float64"))
+            drawdown[name] = {"dates": block.dates, "tickers": list(block.tickers),
+                              "peak": peak, "mdd": mdd}
+        self._state = {
+            "tickers": prices.tickers,
+            "calendar": calendar_name,
+            "dates": dates,
+            "returns": returns,
+            "sums": returns.sum(axis=0),
+            "cross": returns.T @ returns,
+            "drawdown": drawdown,
+        }
+
+    def _align(self, state, prices):
+        """
+        `state` over the tickers of `prices`, on the state's dates.
+
+        Rows and columns of removed tickers are dropped; those of added
+        tickers are computed from `prices` over the state's window. Returns
+        None if an asset class was added or removed.
+        """
+        if set(prices.blocks) != set(state["drawdown"]):
+            return None
+        tickers = prices.tickers
+        position = {t: i for i, t in enumerate(state["tickers"])}
+        old = np.array([position.get(t, -1) for t in tickers], dtype=int)
+        kept, added = np.flatnonzero(old >= 0), np.flatnonzero(old < 0)
+
+        returns = np.empty((len(state["returns"]), len(tickers)))
+        returns[:, kept] = state["returns"][:, old[kept]]
+        sums = np.empty(len(tickers))
+        sums[kept] = state["sums"][old[kept]]
+        cross = np.empty((len(tickers), len(tickers)))
+        cross[np.ix_(kept, kept)] = state["cross"][np.ix_(old[kept], old[kept])]
+        if len(added):
+            returns[:, added] = self._window_returns(prices, state["dates"])[:, added]
+            sums[added] = returns[:, added].sum(axis=0)
+            products = returns.T @ returns[:, added]
+            cross[:, added] = products
+            cross[added, :] = products.T
+
+        drawdown = {}
+        for name, block in prices.blocks.items():
+            dd = state["drawdown"][name]
+            position = {t: j for j, t in enumerate(dd["tickers"])}
+            old = np.array([position.get(t, -1) for t in block.tickers], dtype=int)
+            kept, added = np.flatnonzero(old >= 0), np.flatnonzero(old < 0)
+            peak, mdd = np.empty(len(old)), np.empty(len(old))
+            peak[kept], mdd[kept] = dd["peak"][old[kept]], dd["mdd"][old[kept]]
+            if len(added):
+                # History of the added tickers up to the state's last bar
+                rows = block.dates.searchsorted(dd["dates"][-1], side="right")
+                peak[added], mdd[added] = _drawdown_state(
+                    np.asarray(block.values[:rows, added], dtype="float64"))
+            drawdown[name] = {**dd, "tickers": list(block.tickers), "peak": peak, "mdd": mdd}
+
+        return {**state, "tickers": tickers, "returns": returns, "sums": sums, "cross": cross,
+                "drawdown": drawdown}
+
+    def _incremental(self, prices):
+        """Update the state for a revised or appended last bar; False if not possible."""
+        state = self._state
+        if state is None:
+            return False
+        if prices.tickers != state["tickers"]:
+            state = self._align(state, prices)
+            if state is None:
+                return False
+        calendar_name, calendar = self._calendar(prices)
+        old_dates = state["dates"]
+        if calendar_name != state["calendar"] or len(old_dates) < 3 \
+                or len(calendar) < len(old_dates):
+            return False
+        dates = calendar[-len(old_dates):]
+        revised = dates.equals(old_dates)
+        appended = dates[:-1].equals(old_dates[1:])
+        if not (revised or appended):
+            return False
+
+        drawdown = {}
+        for name, block in prices.blocks.items():
+            dd = state["drawdown"][name]
+            old = dd["dates"]
+            if len(block.dates) == len(old) and block.dates[-1] == old[-1]:
+                drawdown[name] = dd
+                continue
+            if len(block.dates) == len(old) + 1 and block.dates[-2] == old[-1]:
+                # The former last bar becomes history
+                previous = np.asarray(block.values[-2], dtype="float64")
+                peak = np.fmax(dd["peak"], np.nan_to_num(previous, nan=-np.inf))
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    mdd = np.fmin(dd["mdd"], previous / peak - 1)
+                drawdown[name] = {**dd, "dates": block.dates, "peak": peak, "mdd": mdd}
+                continue
+            return False
+
+        # The last two returns are recomputed: an appended bar also finalizes
+        # the previous one, which may have been an intraday value
+        returns = state["returns"]
+        n, shift = len(returns), 0 if revised else 1
+        tail = self._window_returns(prices, dates[-3:])
+        removed = np.vstack([returns[:shift], returns[n - 2 + shift:]])
+        self._state = {
+            **state,
+            "dates": dates,
+            "returns": np.vstack([returns[shift:n - 2 + shift], tail]),
+            "sums": state["sums"] + tail.sum(axis=0) - removed.sum(axis=0),
+            "cross": state["cross"] + (tail.T @ tail - removed.T @ removed),
+            "drawdown": drawdown,
+        }
+        return True
+
+    def update(self, prices):
+        """
+        Bring the metrics up to date with `prices`.
+
+        Args:
+            prices (PriceMatrix): Latest prices.
+
+        Returns:
+            tuple[pd.DataFrame, pd.DataFrame]: Per-ticker metrics and the
+                pairwise correlation matrix.
+        """
+        self.incremental = self._incremental(prices)
+        if not self.incremental:
+            self._full(prices)
+        return self.metrics(prices), self.correlation()
+
+    @property
+    def has_state(self):
+        """Whether an update or `restore` left a state to update incrementally."""
+        return self._state is not None
+
+    def copy(self):
+        """Engine sharing the current state, unaffected by later updates of this one."""
+        engine = RiskEngine(self.window, self.benchmarks)
+        engine._state = self._state
+        return engine
+
+    def save(self, directory):
+        """Write the state next to a snapshot, see `restore`; no-op before the first update."""
+        state = self._state
+        if state is None:
+            return
+        directory = Path(directory)
+        arrays = {"dates": state["dates"].values, "returns": state["returns"],
+                  "sums": state["sums"], "cross": state["cross"]}
+        for name, dd in state["drawdown"].items():
+            arrays.update({f"{name}_dates": dd["dates"].values, f"{name}_peak": dd["peak"],
+                           f"{name}_mdd": dd["mdd"]})
+        np.savez(directory / "risk_state.npz", **arrays)
+        layout = {"window": self.window, "calendar": state["calendar"],
+                  "tickers": state["tickers"],
+                  "blocks": {name: dd["tickers"] for name, dd in state["drawdown"].items()}}
+        (directory / "risk_state.json").write_text(json.dumps(layout))
+
+    def restore(self, directory):
+        """
+        Resume from the state written by `save`, so the next update can be incremental.
+
+        Args:
+            directory (Path): Snapshot directory.
+
+        Returns:
+            bool: Whether a state for this window was found and loaded.
+        """
+        directory = Path(directory)
+        try:
+            layout = json.loads((directory / "risk_state.json").read_text())
+            arrays = np.load(directory / "risk_state.npz")
+        except (FileNotFoundError, ValueError):
+            return False
+        if layout["window"] != self.window:
+            return False
+        with arrays:
+            self._state = {
+                "tickers": layout["tickers"],
+                "calendar": layout["calendar"],
+                "dates": pd.DatetimeIndex(arrays["dates"]),
+                "returns": arrays["returns"],
+                "sums": arrays["sums"],
+                "cross": arrays["cross"],
+                "drawdown": {name: {"dates": pd.DatetimeIndex(arrays[f"{name}_dates"]),
+                                    "tickers": tickers, "peak": arrays[f"{name}_peak"],
+                                    "mdd": arrays[f"{name}_mdd"]}
+                             for name, tickers in layout["blocks"].items()},
+            }
+        return True
+
+    def _covariance(self):
+        state = self._state
+        n = len(state["returns"])
+        sums = state["sums"]
+        return (state["cross"] - np.outer(sums, sums) / n) / max(n - 1, 1), sums / n
+
+    def correlation(self):
+        """Pairwise correlation of window returns (tickers x tickers)."""
+        cov, _ = self._covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        tickers = self._state["tickers"]
+        return pd.DataFrame(corr.astype(np.float32), index=tickers, columns=tickers)
+
+    def metrics(self, prices):
+        """Volatility, Sharpe-style ratio, drawdowns and betas per ticker."""
+        state = self._state
+        cov, mean = self._covariance()
+        periods = PERIODS_PER_YEAR.get(state["calendar"], 252)
+        var = np.diag(cov)
+        vol = np.sqrt(var * periods)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            data = {
+                "vol_1y": vol,
+                "sharpe_1y": mean * periods / vol,
+            }
+            position = {t: i for i, t in enumerate(state["tickers"])}
+            for benchmark in self.benchmarks:
+                if benchmark in position:
+                    b = position[benchmark]
+                    data[f"beta_{benchmark}_1y"] = cov[:, b] / var[b]
+
+        current, maximum = [], []
+        for name, block in prices.blocks.items():
+            dd = state["drawdown"][name]
+            last = np.asarray(block.values[-1], dtype="float64")
+            peak = np.fmax(dd["peak"], np.nan_to_num(last, nan=-np.inf))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                now = last / peak - 1
+            current.append(now)
+            maximum.append(np.fmin(dd["mdd"], now))
+        data["drawdown"] = np.concatenate(current)
+        data["max_drawdown"] = np.concatenate(maximum)
+        return pd.DataFrame(data, index=state["tickers"])
@@ -0,0 +1,375 @@
+import re
+import threading
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+
+"""
+screener.py
+
+Compound screening queries over the summary table. Per-column sorted
+indexes are built once per snapshot, so range and top-N conditions are
+answered by binary search; a query compiles to one boolean mask over the
+universe and its result is cached for the snapshot version.
+
+Query syntax, keywords are case-insensitive:
+
+    `marketCap(Bn)` >= 100 and Sector in (Technology, "Consumer Cyclical")
+    1y_return between 10% and 50% or not dist_ath < -20%
+    Sector in (Technology) top 10 by 1y_return
+
+Columns are written as is or between backticks when they contain spaces;
+`top|bottom N by column` keeps the N highest or lowest matching rows.
+"""
+
+# Screens offered in the dashboard, name -> query
+SAVED_SCREENS = {
+    "Mega caps": "`marketCap(Bn)` >= 100",
+    "Near all-time high": "dist_ath >= -5% and Sector != etf",
+    "Deep drawdown": "drawdown <= -30% and `marketCap(Bn)` >= 10",
+    "Value": "`PE Ratio` between 0 and 15 and dividendYield >= 3%",
+    "Top 1Y momentum": "Sector != etf top 20 by 1y_return",
+    "Worst 1D": "bottom 20 by 1d_return",
+    "Low volatility": "vol_1y <= 20% and beta_SPY_1y < 1 top 20 by sharpe_1y",
+}
+
+_screeners = LRUCache(maxsize=4)
+_screeners_lock = threading.Lock()
+
+
+class ScreenError(ValueError):
+    """Raised when a query cannot be parsed or refers to unknown columns."""
+
+
+# Query AST
+@dataclass(frozen=True)
+class Range:
+    column: str
+    low: float = -np.inf
+    high: float = np.inf
+    include_low: bool = True
+    include_high: bool = True
+
+
+@dataclass(frozen=True)
+class IsIn:
+    column: str
+    values: tuple
+
+
+@dataclass(frozen=True)
+class Not:
+    term: object
+
+
+@dataclass(frozen=True)
+class And:
+    terms: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    terms: tuple
+
+
+@dataclass(frozen=True)
+class Screen:
+    """Compiled query: a row condition (None for all rows) and an optional top-N."""
+    where: object = None
+    top: tuple = None  # (column, n, largest)
+
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<column>`[^`]+`)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE]-?\d+)?%?)(?![\w(])
+      | (?P<op>>=|<=|==|!=|=|>|<|\(|\)|,)
+      | (?P<word>[\w%][\w.%]*(?:\([\w%]+\))?)
+    )""", re.VERBOSE)
+
+_COMPARISONS = {
+    ">=": lambda col, v: Range(col, low=v),
+    ">": lambda col, v: Range(col, low=v, include_low=False),
+    "<=": lambda col, v: Range(col, high=v),
+    "<": lambda col, v: Range(col, high=v, include_high=False),
+}
+
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ScreenError(f"Unexpected input at: {text[pos:]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "column":
+            kind, value = "word", value[1:-1]
+        elif kind == "string":
+            value = value[1:-1]
+        elif kind == "number":
+            value = float(value[:-1]) / 100 if value.endswith("%") else float(value)
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else (None, None)
+
+    def keyword(self, *words):
+        kind, value = self.peek()
+        if kind == "word" and value.lower() in words:
+            self.pos += 1
+            return value.lower()
+        return None
+
+    def expect(self, kind, value=None):
+        token = self.peek()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise ScreenError(f"Expected {value or kind}, got {token[1]!r}")
+        self.pos += 1
+        return token[1]
+
+    def screen(self):
+        where = None
+        if self.peek()[1] is not None and not self._at_top():
+            where = self.expr()
+        top = None
+        direction = self.keyword("top", "bottom")
+        if direction:
+            n = self.expect("number")
+            if not self.keyword("by"):
+                raise ScreenError("Expected 'by' after top/bottom N")
+            top = (self.expect("word"), int(n), direction == "top")
+        if self.peek()[0] is not None:
+            raise ScreenError(f"Unexpected {self.peek()[1]!r}")
+        return Screen(where, top)
+
+    def _at_top(self):
+        kind, value = self.peek()
+        return kind == "word" and value.lower() in ("top", "bottom") and self.peek(1)[0] == "number"
+
+    def expr(self):
+        terms = [self.term()]
+        while self.keyword("or"):
+            terms.append(self.term())
+        return terms[0] if len(terms) == 1 else Or(tuple(terms))
+
+    def term(self):
+        factors = [self.factor()]
+        while self.keyword("and"):
+            factors.append(self.factor())
+        return factors[0] if len(factors) == 1 else And(tuple(factors))
+
+    def factor(self):
+        if self.keyword("not"):
+            return Not(self.factor())
+        if self.peek() == ("op", "("):
+            self.pos += 1
+            inner = self.expr()
+            self.expect("op", ")")
+            return inner
+        column = self.expect("word")
+        if self.keyword("between"):
+            low = self.expect("number")
+            if not self.keyword("and"):
+                raise ScreenError("Expected 'and' in between")
+            return Range(column, low, self.expect("number"))
+        negate = self.keyword("not")
+        if self.keyword("in"):
+            self.expect("op", "(")
+            values = [self.value()]
+            while self.peek() == ("op", ","):
+                self.pos += 1
+                values.append(self.value())
+            self.expect("op", ")")
+            condition = IsIn(column, tuple(values))
+            return Not(condition) if negate else condition
+        if negate:
+            raise ScreenError("Expected 'in' after 'not'")
+        op = self.expect("op")
+        value = self.value()
+        if op == "!=":
+            return Not(self._equals(column, value))
+        if op in ("=", "=="):
+            return self._equals(column, value)
+        if op not in _COMPARISONS or isinstance(value, str):
+            raise ScreenError(f"Invalid comparison {column} {op} {value!r}")
+        return _COMPARISONS[op](column, value)
+
+    def _equals(self, column, value):
+        return IsIn(column, (value,)) if isinstance(value, str) else Range(column, value, value)
+
+    def value(self):
+        kind, value = self.peek()
+        if kind not in ("number", "string", "word"):
+            raise ScreenError(f"Expected a value, got {value!r}")
+        self.pos += 1
+        return value
+
+
+def parse(text):
+    """
+    Parse a screening query.
+
+    Args:
+        text (str): Query, see the module docstring for the syntax.
+
+    Returns:
+        Screen: Parsed query.
+    """
+    return _Parser(text).screen()
+
+
+class ColumnIndex:
+    """Row positions of a numeric column sorted by value, NaN excluded."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype="float64")
+        valid = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[valid], kind="stable")
+        self.positions = valid[order]
+        self.values = values[self.positions]
+
+    def range(self, low, high, include_low=True, include_high=True):
+        """Positions of rows with a value within [low, high] (bounds as specified)."""
+        start = np.searchsorted(self.values, low, side="left" if include_low else "right")
+        end = np.searchsorted(self.values, high, side="right" if include_high else "left")
+        return self.positions[start:max(start, end)]
+
+    def top(self, n, mask, largest=True):
+        """Positions of the `n` rows with the largest (or smallest) value among `mask`."""
+        ordered = self.positions[::-1] if largest else self.positions
+        return ordered[mask[ordered]][:n]
+
+
+class Screener:
+    """
+    Screening engine over one summary table.
+
+    Numeric columns get a `ColumnIndex` and text columns a value -> positions
+    map, both built on first use and kept for the life of the snapshot.
+    Results are cached per query.
+
+    Args:
+        summary (pd.DataFrame): Summary table of a snapshot.
+    """
+
+    def __init__(self, summary):
+        self.summary = summary
+        self._numeric = {}
+        self._categories = {}
+        self._results = LRUCache(maxsize=256)
+        self._lock = threading.Lock()
+
+    def _column(self, column):
+        if column not in self.summary.columns:
+            raise ScreenError(f"Unknown column: {column}")
+        return self.summary[column]
+
+    def _numeric_index(self, column):
+        index = self._numeric.get(column)
+        if index is None:
+            values = self._column(column)
+            if not pd.api.types.is_numeric_dtype(values):
+                raise ScreenError(f"Column {column} is not numeric")
+            index = self._numeric[column] = ColumnIndex(values.to_numpy())
+        return index
+
+    def _category_index(self, column):
+        index = self._categories.get(column)
+        if index is None:
+            codes, uniques = pd.factorize(self._column(column).astype("string").str.lower())
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            index = self._categories[column] = {
+                value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+        return index
+
+    def _positions(self, node):
+        if isinstance(node, Range):
+            return self._numeric_index(node.column).range(
+                node.low, node.high, node.include_low, node.include_high)
+        if isinstance(node, IsIn):
+            if pd.api.types.is_numeric_dtype(self._column(node.column)):
+                numbers = [v for v in node.values if not isinstance(v, str)]
+                index = self._numeric_index(node.column)
+                return np.concatenate([index.range(v, v) for v in numbers] or [np.array([], int)])
+            groups = self._category_index(node.column)
+            return np.concatenate([groups.get(str(v).lower(), np.array([], int))
+                                   for v in node.values])
+        raise ScreenError(f"Unsupported condition: {node}")
+
+    def _mask(self, node):
+        n = len(self.summary)
+        if node is None:
+            return np.ones(n, dtype=bool)
+        if isinstance(node, And):
+            return np.logical_and.reduce([self._mask(t) for t in node.terms])
+        if isinstance(node, Or):
+            return np.logical_or.reduce([self._mask(t) for t in node.terms])
+        if isinstance(node, Not):
+            return ~self._mask(node.term)
+        mask = np.zeros(n, dtype=bool)
+        mask[self._positions(node)] = True
+        return mask
+
+    def positions(self, query):
+        """
+        Row positions matching a query, in summary order or ranked for top-N.
+
+        Args:
+            query (str | Screen): Query text or parsed query.
+
+        Returns:
+            np.ndarray: Positions into `summary`.
+        """
+        with self._lock:
+            cached = self._results.get(query)
+        if cached is not None:
+            return cached
+        screen = parse(query) if isinstance(query, str) else query
+        mask = self._mask(screen.where)
+        if screen.top is None:
+            result = np.flatnonzero(mask)
+        else:
+            column, n, largest = screen.top
+            result = self._numeric_index(column).top(n, mask, largest)
+        with self._lock:
+            self._results[query] = result
+        return result
+
+    def run(self, query):
+        """Rows of the summary matching `query`."""
+        return self.summary.iloc[self.positions(query)]
+
+
+def get_screener(summary, version):
+    """
+    Screener for a snapshot, built once per `version` and shared by reruns.
+
+    Args:
+        summary (pd.DataFrame): Summary table of the snapshot.
+        version: Snapshot identifier, e.g. its update time. Without one the
+            screener is built for this call only and not cached.
+
+    Returns:
+        Screener
+    """
+    if version is None:
+        return Screener(summary)
+    with _screeners_lock:
+        screener = _screeners.get(version)
+        if screener is None:
+            screener = _screeners[version] = Screener(summary)
+        return screener
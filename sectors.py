@@ -0,0 +1,208 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+"""
+sectors.py
+
+Sector aggregates computed once per snapshot: the sector -> tickers index,
+cap-weighted and equal-weighted returns of every sector for every horizon,
+and a cap-weighted daily index series per sector. All aggregations are
+products with a ticker x sector membership matrix, so the dashboard never
+groups the summary table at render time.
+"""
+
+# Level of every sector index on its first date
+INDEX_BASE = 100.0
+
+
+def _membership(sectors, names):
+    """One-hot ticker x sector matrix for `names`."""
+    matrix = np.zeros((len(sectors), len(names)))
+    position = {name: k for k, name in enumerate(names)}
+    for i, sector in enumerate(sectors):
+        k = position.get(sector)
+        if k is not None:
+            matrix[i, k] = 1.0
+    return matrix
+
+
+def _weighted_mean(values, weights, membership):
+    """Per-sector weighted mean of every column of `values` (tickers x columns), NaN skipped."""
+    valid = ~np.isnan(values) & ~np.isnan(weights)[:, None]
+    w = np.where(valid, np.nan_to_num(weights)[:, None], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ((np.where(valid, values, 0.0) * w).T @ membership
+                / (w.T @ membership)).T
+
+
+def _index_series(block, tickers, sectors, caps, names):
+    """
+    Cap-weighted index of each sector in `names` on the block's calendar.
+
+    Shares outstanding are taken as constant (current market cap over last
+    price), so each day's sector return weighs constituents by their market
+    cap on the previous day. Constituents join the index when their history
+    starts.
+    """
+    columns = [block.tickers.index(t) for t in tickers]
+    prices = np.asarray(block.values[:, columns], dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = caps / prices[-1]
+        prev_caps = prices[:-1] * shares
+        returns = prices[1:] / prices[:-1] - 1
+    valid = np.isfinite(prev_caps) & np.isfinite(returns)
+    membership = _membership(sectors, names)
+    weights = np.where(valid, prev_caps, 0.0) @ membership
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sector_returns = (np.where(valid, prev_caps * returns, 0.0) @ membership) / weights
+    levels = INDEX_BASE * np.cumprod(1 + np.nan_to_num(sector_returns), axis=0)
+    levels = np.vstack([np.full(len(names), INDEX_BASE), levels])
+    # No level before a sector's first day with constituents
+    has_members = weights > 0
+    first = np.where(has_members.any(axis=0), has_members.argmax(axis=0), len(levels))
+    levels[np.arange(len(levels))[:, None] < first] = np.nan
+    return pd.DataFrame(levels, index=block.dates, columns=names)
+
+
+class SectorAggregates:
+    """
+    Per-sector views of one snapshot.
+
+    Attributes:
+        members (dict): sector -> tickers, in summary order.
+        market_cap (pd.Series): Total market cap (Bn) per sector.
+        cap_weighted (pd.DataFrame): Cap-weighted returns (sectors x horizons).
+        equal_weighted (pd.DataFrame): Equal-weighted returns (sectors x horizons).
+        index_series (pd.DataFrame): Cap-weighted daily sector indexes
+            (dates x sectors), or None if computed without prices.
+    """
+
+    def __init__(self, members, market_cap, cap_weighted, equal_weighted, index_series=None):
+        self.members = members
+        self.market_cap = market_cap
+        self.cap_weighted = cap_weighted
+        self.equal_weighted = equal_weighted
+        self.index_series = index_series
+
+    @property
+    def sectors(self):
+        return list(self.members)
+
+    @classmethod
+    def compute(cls, summary, prices=None):
+        """
+        Aggregate a summary table, and its prices for the index series.
+
+        Args:
+            summary (pd.DataFrame): Summary with 'Sector', 'marketCap(Bn)'
+                and '<horizon>_return' columns.
+            prices (PriceMatrix): Price blocks of the summary's tickers.
+
+        Returns:
+            SectorAggregates
+        """
+        sectors = summary['Sector'].to_numpy()
+        names = list(pd.unique(summary['Sector'].dropna()))
+        members = {name: list(summary.index[sectors == name]) for name in names}
+        membership = _membership(sectors, names)
+        caps = pd.to_numeric(summary['marketCap(Bn)'], errors='coerce').to_numpy(dtype="float64")
+        return_columns = [c for c in summary.columns if c.endswith('_return')]
+        values = summary[return_columns].to_numpy(dtype="float64")
+
+        cap_weighted = pd.DataFrame(_weighted_mean(values, caps, membership),
+                                    index=names, columns=return_columns)
+        equal_weighted = pd.DataFrame(_weighted_mean(values, np.ones(len(caps)), membership),
+                                      index=names, columns=return_columns)
+        market_cap = pd.Series(np.nan_to_num(caps) @ membership, index=names)
+
+        index_series = None
+        if prices is not None:
+            index_series = cls._index_frame(summary, prices, caps, names)
+        return cls(members, market_cap, cap_weighted, equal_weighted, index_series)
+
+    def with_returns(self, summary):
+        """
+        Aggregates of a summary whose returns changed since `compute`, e.g.
+        in live mode; the daily index series is kept as is.
+
+        Args:
+            summary (pd.DataFrame): Summary with updated return columns.
+
+        Returns:
+            SectorAggregates
+        """
+        aggregates = self.compute(summary)
+        aggregates.index_series = self.index_series
+        return aggregates
+
+    @staticmethod
+    def _index_frame(summary, prices, caps, names):
+        position = {t: i for i, t in enumerate(summary.index)}
+        # Each sector is indexed on the calendar of the block holding most of its members
+        home = {}
+        for name in names:
+            blocks = [prices.index[t][0] for t in summary.index[summary['Sector'] == name]
+                      if t in prices]
+            if blocks:
+                home[name] = max(set(blocks), key=blocks.count)
+        frames = []
+        for block_name, block in prices.blocks.items():
+            block_sectors = [n for n in names if home.get(n) == block_name]
+            tickers = [t for t in block.tickers
+                       if t in position and summary['Sector'].iat[position[t]] in block_sectors]
+            if not tickers:
+                continue
+            rows = [position[t] for t in tickers]
+            frames.append(_index_series(block, tickers, summary['Sector'].to_numpy()[rows],
+                                        caps[rows], block_sectors))
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        dates = frames[0].index
+        for frame in frames[1:]:
+            dates = dates.union(frame.index)
+        return pd.concat([f.reindex(dates) for f in frames], axis=1).ffill()
+
+    def table(self, weighting="cap"):
+        """Sector returns for every horizon with the sector's market cap and size."""
+        returns = self.cap_weighted if weighting == "cap" else self.equal_weighted
+        table = returns.copy()
+        table.insert(0, 'constituents', [len(self.members[s]) for s in returns.index])
+        table.insert(1, 'marketCap(Bn)', self.market_cap)
+        return table
+
+    def save(self, directory):
+        """Write the aggregates as JSON and the index series as .npy."""
+        directory = Path(directory)
+        layout = {
+            "members": self.members,
+            "market_cap": self.market_cap.to_dict(),
+            "cap_weighted": self.cap_weighted.to_dict(orient="split"),
+            "equal_weighted": self.equal_weighted.to_dict(orient="split"),
+            "index_columns": None if self.index_series is None else list(self.index_series.columns),
+        }
+        if self.index_series is not None:
+            np.save(directory / "sector_index.npy", self.index_series.to_numpy(dtype="float64"))
+            np.save(directory / "sector_index_dates.npy", self.index_series.index.values)
+        (directory / "sectors.json").write_text(json.dumps(layout))
+
+    @classmethod
+    def load(cls, directory):
+        """Read aggregates written by `save`."""
+        directory = Path(directory)
+        layout = json.loads((directory / "sectors.json").read_text())
+
+        def frame(split):
+            return pd.DataFrame(split["data"], index=split["index"], columns=split["columns"],
+                                dtype="float64")
+
+        index_series = None
+        if layout["index_columns"] is not None:
+            index_series = pd.DataFrame(np.load(directory / "sector_index.npy"),
+                                        index=pd.DatetimeIndex(np.load(directory / "sector_index_dates.npy")),
+                                        columns=layout["index_columns"])
+        return cls(layout["members"], pd.Series(layout["market_cap"], dtype="float64"),
+                   frame(layout["cap_weighted"]), frame(layout["equal_weighted"]), index_series)
@@ -0,0 +1,249 @@
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from indicators import IndicatorCube
+from metrics import REGISTRY, export, log_event
+from price_matrix import PriceMatrix
+from price_store import DATA_DIR, _write_atomically
+from refresh import SnapshotRefresher
+from risk import RiskEngine
+from sectors import SectorAggregates
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process produces its own snapshot
+    fcntl = None
+
+"""
+snapshot_store.py
+
+Versioned on-disk snapshots shared by all app processes on a host. One
+producer process builds the snapshot and writes it to disk (price and
+indicator blocks and the correlation matrix as .npy, the summary as Arrow
+IPC, sector aggregates as JSON) with a JSON manifest pointing at the latest
+version; every process memory-maps the files, so prices are zero-copy
+views on the page cache instead of per-process copies, and upstream calls
+scale with refresh frequency rather than with the number of replicas.
+"""
+
+SNAPSHOT_DIR = Path(DATA_DIR) / "snapshots"
+
+# Versions kept on disk so readers still mapping an older one are not disturbed
+KEEP_VERSIONS = 3
+
+# Seconds a Market view waits for a first snapshot before reporting it missing
+SNAPSHOT_WAIT = int(os.environ.get("YFH_SNAPSHOT_WAIT", 600))
+
+
+class Snapshot(NamedTuple):
+    """Dataset served by the dashboard."""
+    prices: PriceMatrix
+    summary: pd.DataFrame
+    update_dt: datetime.datetime
+    indicators: IndicatorCube = None
+    correlation: pd.DataFrame = None
+    sectors: SectorAggregates = None
+    # kind -> tickers that could not be refreshed; not persisted
+    missing: dict = None
+    # Time of the live tick applied to the prices, None outside live mode; not persisted
+    live_dt: datetime.datetime = None
+    # Engine the risk columns come from; its state is saved to resume the next build
+    risk: RiskEngine = None
+
+    @property
+    def version(self):
+        """Time of the data served: the live tick if any, else the snapshot build."""
+        return self.live_dt or self.update_dt
+
+
+def _write_table(table, path):
+    with pa.OSFile(str(path), "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_table(path):
+    return ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def _summary_table(summary):
+    # Yahoo occasionally mixes strings such as 'Infinity' into numeric fields
+    summary = summary.copy()
+    for column in summary.columns[summary.dtypes == object]:
+        values = summary[column].dropna()
+        if not values.map(lambda v: isinstance(v, str)).all():
+            summary[column] = pd.to_numeric(summary[column], errors="coerce")
+    return pa.Table.from_pandas(summary)
+
+
+def _write_correlation(correlation, directory):
+    np.save(directory / "correlation.npy", correlation.to_numpy(dtype=np.float32))
+    (directory / "correlation.json").write_text(json.dumps(list(correlation.index)))
+
+
+def _read_correlation(directory):
+    path = directory / "correlation.npy"
+    if not path.exists():
+        return None
+    tickers = json.loads((directory / "correlation.json").read_text())
+    return pd.DataFrame(np.load(path, mmap_mode="r"), index=tickers, columns=tickers, copy=False)
+
+
+def write_snapshot(snapshot, root=SNAPSHOT_DIR):
+    """
+    Persist a snapshot as a new version and point the manifest at it.
+
+    Args:
+        snapshot (Snapshot): Dataset to publish.
+        root (Path): Snapshot directory.
+
+    Returns:
+        str: The new version name.
+    """
+    root = Path(root)
+    version = snapshot.update_dt.strftime("%Y%m%dT%H%M%S%fZ")
+    directory = root / version
+    directory.mkdir(parents=True, exist_ok=True)
+    snapshot.prices.save(directory)
+    snapshot.indicators.save(directory)
+    if snapshot.correlation is not None:
+        _write_correlation(snapshot.correlation, directory)
+    if snapshot.sectors is not None:
+        snapshot.sectors.save(directory)
+    if snapshot.risk is not None:
+        snapshot.risk.save(directory)
+    _write_table(_summary_table(snapshot.summary), directory / "summary.arrow")
+
+    REGISTRY.set("yfh_snapshot_disk_bytes",
+                 sum(p.stat().st_size for p in directory.iterdir()))
+
+    manifest = {"version": version, "update_dt": snapshot.update_dt.isoformat()}
+    # The CLI and an in-app producer may publish to the same directory
+    _write_atomically(root / "manifest.json",
+                      lambda tmp: Path(tmp).write_text(json.dumps(manifest)))
+
+    versions = sorted(p for p in root.iterdir() if p.is_dir())
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(old, ignore_errors=True)
+    return version
+
+
+def read_manifest(root=SNAPSHOT_DIR):
+    """Latest manifest, or None if no snapshot was published yet."""
+    path = Path(root) / "manifest.json"
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def load_snapshot(manifest, root=SNAPSHOT_DIR):
+    """
+    Memory-map the snapshot version named by `manifest`.
+
+    Args:
+        manifest (dict): Manifest as returned by `read_manifest`.
+        root (Path): Snapshot directory.
+
+    Returns:
+        Snapshot: prices, indicators and correlation backed by the mapped
+            files, summary, update time and sector aggregates.
+    """
+    directory = Path(root) / manifest["version"]
+    prices = PriceMatrix.load(directory)
+    indicators = IndicatorCube.load(directory, prices)
+    summary = _read_table(directory / "summary.arrow").to_pandas()
+    update_dt = datetime.datetime.fromisoformat(manifest["update_dt"])
+    correlation = _read_correlation(directory)
+    if (directory / "sectors.json").exists():
+        sectors = SectorAggregates.load(directory)
+    else:
+        sectors = SectorAggregates.compute(summary, prices)
+    return Snapshot(prices, summary, update_dt, indicators, correlation, sectors)
+
+
+class SharedSnapshot:
+    """
+    Snapshot shared by all processes through `root`.
+
+    The first process to take the producer lock runs a `SnapshotRefresher`
+    that publishes new versions; if it exits, the lock is released and the
+    next reader to call `get` takes over. Every process, producer included,
+    serves the version named in the manifest and reloads it when the
+    manifest changes. Without `build` the process only reads snapshots
+    published by others, e.g. by `build_snapshot_cli.py` run from cron.
+
+    Args:
+        build (callable): Builds a new snapshot (producer only), or None.
+        root (Path): Snapshot directory.
+    """
+
+    def __init__(self, build=None, root=SNAPSHOT_DIR):
+        self.build = build
+        self.root = Path(root)
+        self._lock_file = None
+        self._refresher = None
+        self._version = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_producer(self):
+        return self._refresher is not None
+
+    def _try_become_producer(self):
+        if self._refresher is not None or self.build is None:
+            return
+        if fcntl is not None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            lock_file = open(self.root / "producer.lock", "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return
+            self._lock_file = lock_file
+        logging.info(f"Process {os.getpid()} is the snapshot producer")
+        self._refresher = SnapshotRefresher(self._publish).start()
+
+    def _publish(self):
+        version = write_snapshot(self.build(), self.root)
+        log_event("snapshot_published", version=version, pid=os.getpid())
+        export()
+        return version
+
+    def get(self, timeout=None, poll=1.0):
+        """
+        Latest published snapshot, waiting for the first one if needed.
+
+        Args:
+            timeout (float): Seconds to wait for a first snapshot.
+            poll (float): Seconds between manifest checks while waiting.
+
+        Returns:
+            Snapshot, or None if nothing was published within `timeout`.
+        """
+        with self._lock:
+            self._try_become_producer()
+        started = time.monotonic()
+        manifest = read_manifest(self.root)
+        while manifest is None:
+            if timeout is not None and time.monotonic() - started > timeout:
+                return None
+            time.sleep(poll)
+            manifest = read_manifest(self.root)
+        with self._lock:
+            if manifest["version"] != self._version:
+                self._snapshot = load_snapshot(manifest, self.root)
+                self._version = manifest["version"]
+            return self._snapshot
@@ -1,6 +1,10 @@
-import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 import streamlit as st 
+from downsample import MAX_POINTS, downsample, downsample_frame
+from indicators import DEFAULT_OVERLAYS, INDICATORS
+from screener import SAVED_SCREENS, ScreenError, get_screener
+from sectors import SectorAggregates
 
 SHORT_COLUMNS = [
     'price_last', '1d_return', '1w_return', '1m_return', '1y_return',
@@ -15,56 +19,77 @@ FUNDAMENTALS_COLUMNS = [
     'PE Ratio', 'averageVolume(mil)', 'shortPercentOfFloat',
     'trailingEps', 'forwardEps', 'debtToEquity'
 ]
+
+RISK_COLUMNS = [
+    'vol_1y', 'sharpe_1y', 'drawdown', 'max_drawdown', 'beta_SPY_1y', 'beta_QQQ_1y'
+]
+
+# Traces with more points than this are drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 1000
+
+# Plotly is imported on the first figure, not with the module
+def _plotly():
+    import plotly.graph_objects as go
+    return go
   
 # Styling Functions
-def style_values(value, negative_style="color:red;", positive_style="color:green;"):
-    """Apply styles based on value."""
-    if pd.isna(value) or isinstance(value, str):
-        return None
-    return negative_style if value < 0 else positive_style if value > 0 else None
+def style_frame(df, negative_style="color:red;", positive_style="color:green;"):
+    """Color negative numbers red and positive ones green; text and NaN are left unstyled."""
+    styles = pd.DataFrame('', index=df.index, columns=df.columns)
+    for col in df.columns[[pd.api.types.is_numeric_dtype(t) for t in df.dtypes]]:
+        values = df[col].to_numpy(dtype='float64')
+        styles[col] = np.select([values < 0, values > 0], [negative_style, positive_style], '')
+    return styles
+
+
+# Columns shown as percentages besides every `*_return` column
+PERCENT_COLUMNS = ['dist_ath', 'dividendYield', 'vol_1y', 'drawdown', 'max_drawdown']
 
 
 def style_dataframe(summary):
     """Apply styles and formatting to a DataFrame."""
-    style_format = {
-        '1d_return': '{:.2%}', '1w_return': '{:.2%}', '1m_return': '{:.2%}',
-        '1y_return': '{:.2%}', 'dist_ath': '{:.2%}', 'dividendYield': '{:.2%}'
-    }
-    return summary.style.applymap(style_values).format(style_format, precision=2)
+    style_format = {col: '{:.2%}' for col in summary.columns
+                    if str(col).endswith('_return') or col in PERCENT_COLUMNS}
+    return summary.style.apply(style_frame, axis=None).format(style_format, precision=2)
 
 # Data Filtering
-def filter_dataframe(summary, default_column="marketCap(Bn)", default_filter_condition=">=", default_value=100):
-    """Filter DataFrame based on user inputs."""
-    column = st.selectbox("Select column to filter", summary.columns, index=list(summary.columns).index(default_column))
-    condition = st.selectbox("Select filter condition", ["=", ">=", "<="], index=["=", ">=", "<="].index(default_filter_condition))
-    value = st.number_input("Enter filter value", value=default_value)
-    
-    filters = {
-        "=": lambda df, col, val: df[df[col] == val],
-        ">=": lambda df, col, val: df[df[col] >= val],
-        "<=": lambda df, col, val: df[df[col] <= val],
-    }
-    return filters[condition](summary, column, value)
+def filter_dataframe(summary, version=None, default_screen="Mega caps"):
+    """
+    Filter DataFrame with a saved or custom screening query.
+
+    Column indexes are reused across reruns when a snapshot `version` is given.
+    """
+    names = list(SAVED_SCREENS) + ["Custom"]
+    screen = st.selectbox("Select screen", names, index=names.index(default_screen))
+    default_query = SAVED_SCREENS.get(screen, SAVED_SCREENS[default_screen])
+    query = st.text_input("Screening query", value=default_query, key=f"screen_query_{screen}",
+                          help="e.g. `marketCap(Bn)` >= 100 and Sector in (Technology) top 10 by 1y_return")
+    try:
+        return get_screener(summary, version).run(query)
+    except ScreenError as e:
+        st.error(f"Invalid screen: {e}")
+        return summary.iloc[:0]
 
     
 # Tree Map Visualization
-def create_tree_map(summary):
-    """ Filter summary dataframe based on a columns """
+def create_tree_map(summary, sectors=None):
+    """ Tree map of last-day returns, sector nodes read from the sector aggregates """
+    if sectors is None:
+        sectors = SectorAggregates.compute(summary)
     df = summary[['1d_return','marketCap(Bn)','Sector']].reset_index()
     df = df[lambda x : x.Sector!='etf']
     df = df.rename(columns={'index':'id','1d_return' : 'color',
                             'marketCap(Bn)' :'value','Sector':'parent'})
-    df_parent = df.copy()
-    df_parent['weighted_return']=df_parent['color']*df_parent['value']
-    df_parent = df_parent.groupby('parent').sum()[['weighted_return','value']].reset_index()
-    df_parent['color']=df_parent['weighted_return']/df_parent['value']
-    df_parent = df_parent.rename(columns={'parent':'id'})
-    df_parent['parent']='total'
-    df_parent = df_parent[['id', 'color', 'value', 'parent']]
+    df_parent = pd.DataFrame({'id': sectors.sectors,
+                              'color': sectors.cap_weighted['1d_return'].to_numpy(),
+                              'value': sectors.market_cap.to_numpy(),
+                              'parent': 'total'})
+    df_parent = df_parent[lambda x : x.id!='etf']
     
     all_data = pd.concat([df_parent.dropna(),df])
     colorscale = [[0.0, "red"], [0.5, "white"], [1.0, "green"]]
     
+    go = _plotly()
     fig = go.Figure()
     fig.add_trace(go.Treemap(
         labels=all_data['id'],
@@ -83,28 +108,74 @@ def create_tree_map(summary):
     fig.update_layout(margin = dict(t=50, l=25, r=25, b=25))
     return fig
 
+# Line traces, downsampled to the point budget and drawn with WebGL when long
+def line_trace(series, name, max_points=MAX_POINTS, version=None, downsampled=False):
+    """Build a line trace of `series` holding at most `max_points` points."""
+    go = _plotly()
+    if not downsampled:
+        key = None
+        if version is not None and len(series):
+            key = (version, name, series.index[0], series.index[-1], len(series), max_points)
+        series = downsample(series, max_points, key=key)
+    trace_type = go.Scattergl if len(series) > WEBGL_THRESHOLD else go.Scatter
+    return trace_type(x=series.index, y=series.values, mode='lines', name=name)
+
 # Multi-Symbol Graph
-def plot_multiple_symbols(data, normalize=True):
+def plot_multiple_symbols(data, normalize=True, max_points=MAX_POINTS, version=None,
+                          title='Symbol Performance'):
     """Plot multiple symbols over time."""
+    go = _plotly()
     if normalize:
         data = data / data.iloc[0]
     fig = go.Figure()
-    for col in data.columns:
-        fig.add_trace(go.Scatter(x=data.index, y=data[col], mode='lines', name=col))
-    fig.update_layout(title='Symbol Performance', xaxis_title='Time', yaxis_title='Normalized Prices')
+    if len(data) and not data.isna().any().any():
+        key = None if version is None else \
+            (version, tuple(data.columns), data.index[0], data.index[-1], len(data), max_points)
+        series = downsample_frame(data, max_points, key=key)
+        for col in data.columns:
+            fig.add_trace(line_trace(series[col], col, downsampled=True))
+    else:
+        for col in data.columns:
+            fig.add_trace(line_trace(data[col], col, max_points, version))
+    fig.update_layout(title=title, xaxis_title='Time', yaxis_title='Normalized Prices')
+    return fig
+
+# Correlation Heatmap
+def plot_correlation_heatmap(correlation, symbols):
+    """Plot the pairwise return correlation of `symbols` from the snapshot's matrix."""
+    go = _plotly()
+    symbols = [s for s in symbols if s in correlation.index]
+    data = correlation.loc[symbols, symbols]
+    fig = go.Figure(go.Heatmap(
+        z=data.to_numpy(), x=symbols, y=symbols,
+        colorscale='RdBu', zmin=-1, zmax=1, reversescale=True,
+        hovertemplate='%{y} / %{x}: %{z:.2f}<extra></extra>'
+    ))
+    fig.update_layout(title='1Y Daily Return Correlation', yaxis_autorange='reversed')
     return fig
 
 # Single Symbol Graph
-def plot_single_symbol(data, moving_avgs=(7, 30, 365)):
-    """Plot a single symbol with moving averages."""
+def plot_single_symbol(data, indicators=None, overlays=DEFAULT_OVERLAYS, panel=None,
+                       max_points=MAX_POINTS, version=None):
+    """Plot a single symbol with precomputed indicator overlays and an optional lower panel."""
     symbol = data.columns[0]
-    for ma in moving_avgs:
-        data[f'price_{ma}_ma'] = data[symbol].rolling(ma).mean()
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=data.index, y=data[symbol], mode='lines', name=symbol))
-    for ma in moving_avgs:
-        fig.add_trace(go.Scatter(x=data.index, y=data[f'price_{ma}_ma'], mode='lines', name=f'{ma}d MA'))
-    fig.update_layout(title=f'{symbol} Price & Moving Averages', xaxis_title='Time', yaxis_title='Price')
+    names = list(overlays) + ([panel] if panel else [])
+    if indicators is None:
+        indicators = pd.DataFrame({name: INDICATORS[name][1](data[symbol]) for name in names})
+    indicators = indicators.loc[data.index[0]:data.index[-1]] if len(data) else indicators
+    version = None if version is None else (version, symbol)
+    go = _plotly()
+    from plotly.subplots import make_subplots
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3],
+                        vertical_spacing=0.05) if panel else go.Figure()
+    row = dict(row=1, col=1) if panel else {}
+    fig.add_trace(line_trace(data[symbol], symbol, max_points, version), **row)
+    for name in overlays:
+        fig.add_trace(line_trace(indicators[name], INDICATORS[name][0], max_points, version), **row)
+    if panel:
+        fig.add_trace(line_trace(indicators[panel], INDICATORS[panel][0], max_points, version),
+                      row=2, col=1)
+    fig.update_layout(title=f'{symbol} Price & Indicators', xaxis_title='Time', yaxis_title='Price')
     return fig
 
                 
@@ -153,4 +224,15 @@ def display_fundamental_metrics(columns, data, pct_columns):
     
     
     
-    
\ No newline at end of file
+    
+
+def display_diagnostics(samples):
+    """Display pipeline metrics grouped by metric name."""
+    df = pd.DataFrame(samples)
+    if df.empty:
+        st.write("No metrics recorded yet.")
+        return
+    df['labels'] = df['labels'].map(lambda labels: ', '.join(f"{k}={v}" for k, v in labels.items()))
+    for name, group in df.groupby('name', sort=True):
+        st.caption(name)
+        st.dataframe(group.drop(columns='name').set_index('labels').dropna(axis=1, how='all'))
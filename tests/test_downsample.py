@@ -0,0 +1,28 @@
+import numpy as np
+from downsample import lttb
+
+"""
+tests/test_downsample.py
+
+Tests of the LTTB downsampling of chart series.
+"""
+
+
+def test_lttb():
+    rng = np.random.default_rng(2)
+    n = 10_000
+    x = np.arange(n, dtype="float64")
+    y = np.cumsum(rng.normal(size=(n, 3)), axis=0)
+    y[5_000, 1] = 1e6
+
+    kept = lttb(x, y, 500)
+    assert kept.shape == (500, 3)
+    assert (kept[0] == 0).all() and (kept[-1] == n - 1).all()
+    assert (np.diff(kept, axis=0) > 0).all()
+    # An outlier always makes the largest triangle of its bucket
+    assert 5_000 in kept[:, 1]
+    # Columns are downsampled independently
+    for k in range(3):
+        assert np.array_equal(kept[:, k], lttb(x, y[:, k], 500))
+
+    assert np.array_equal(lttb(x[:100], y[:100, 0], 500), np.arange(100))
@@ -0,0 +1,99 @@
+import threading
+import time
+import pytest
+from fetcher import AdaptiveLimiter, TokenBucket, fetch_all, is_throttled
+
+"""
+tests/test_fetcher.py
+
+Tests of the fetch engine: retries, deadline and concurrency limits.
+"""
+
+
+class Flaky:
+    """Fails the first `failures` calls of every item."""
+
+    def __init__(self, failures, error=RuntimeError("boom")):
+        self.failures = failures
+        self.error = error
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        with self.lock:
+            self.calls[item] = self.calls.get(item, 0) + 1
+            calls = self.calls[item]
+        if calls <= self.failures:
+            raise self.error
+        return item * 2
+
+
+def test_retries():
+    fn = Flaky(failures=2)
+    result = fetch_all(fn, [1, 2, 3], max_workers=3, rate=1000, retries=2, backoff=0.001)
+    assert result.results == {1: 2, 2: 4, 3: 6}
+    assert result.failed == [] and result.retries == 6
+
+
+def test_retries_exhausted():
+    fn = Flaky(failures=5)
+    result = fetch_all(fn, [1, 2], max_workers=2, rate=1000, retries=1, backoff=0.001)
+    assert result.results == {}
+    assert sorted(result.failed) == [1, 2]
+    assert all(isinstance(e, RuntimeError) for e in result.errors.values())
+    assert fn.calls == {1: 2, 2: 2}
+
+
+def test_deadline():
+    def slow(item):
+        time.sleep(0.3 if item else 0)
+        return item
+
+    started = time.monotonic()
+    result = fetch_all(slow, [0, 1, 2], max_workers=3, rate=1000, deadline=0.1)
+    assert time.monotonic() - started < 0.25
+    assert result.results == {0: 0}
+    assert sorted(result.failed) == [1, 2]
+    assert all(isinstance(result.errors[i], TimeoutError) for i in (1, 2))
+
+
+def test_rate_limited_items_fail_at_deadline():
+    # One token per second: only the first call starts before the deadline
+    result = fetch_all(lambda item: item, list(range(5)), max_workers=5, rate=1, deadline=0.2)
+    assert len(result.results) == 1
+    assert len(result.failed) == 4
+
+
+def test_limiter_slot_released_when_bucket_times_out():
+    limiter = AdaptiveLimiter(2)
+    assert limiter.acquire() and limiter.acquire(time.monotonic() + 0.01)
+    limiter.cancel()
+    assert limiter._active == 1 and limiter.limit == 2
+    assert limiter.acquire(time.monotonic() + 0.01)
+    assert not limiter.acquire(time.monotonic() + 0.01)
+
+
+def test_limiter_adapts():
+    limiter = AdaptiveLimiter(4)
+    limiter.acquire()
+    limiter.release(ok=False)
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.acquire()
+        limiter.release(ok=True)
+    assert limiter.limit == 3
+
+
+def test_token_bucket_deadline():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(time.monotonic() + 0.1)
+
+
+@pytest.mark.parametrize("error, throttled", [
+    (RuntimeError("429 Client Error: Too Many Requests"), True),
+    (type("YFRateLimitError", (Exception,), {})("Rate limited"), True),
+    (RuntimeError("boom"), False),
+])
+def test_is_throttled(error, throttled):
+    assert is_throttled(error) == throttled
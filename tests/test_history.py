@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+import pandas as pd
+import history
+from fetcher import fetch_all
+from history import download_history
+from providers import MarketDataProvider
+
+"""
+tests/test_history.py
+
+Tests of the chunked history download and its per-ticker fallback.
+"""
+
+DATES = pd.bdate_range("2024-01-01", "2024-01-31")
+
+
+class ChunkProvider(MarketDataProvider):
+    """
+    Bulk history where any request including a `broken` ticker fails and
+    `empty` tickers come back as all-NaN columns, like yf.download.
+    """
+
+    def __init__(self, broken=(), empty=(), concurrency=None):
+        self.broken, self.empty = set(broken), set(empty)
+        self.history_concurrency = concurrency
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def history(self, tickers, start):
+        with self.lock:
+            self.requests.append(tuple(tickers))
+        if self.broken & set(tickers):
+            raise RuntimeError("download failed")
+        return pd.DataFrame({t: np.nan if t in self.empty else float(len(t))
+                             for t in tickers}, index=DATES)
+
+
+def test_chunks():
+    tickers = [f"T{i}" for i in range(25)]
+    provider = ChunkProvider()
+    result = download_history(provider, tickers + ["T0"], "2024-01-01", chunk_size=10)
+    assert result.missing == []
+    assert list(result.close.columns) == tickers
+    assert sorted(len(r) for r in provider.requests) == [5, 10, 10]
+
+
+def test_fallback_to_single_tickers():
+    tickers = [f"T{i}" for i in range(10)]
+    provider = ChunkProvider(broken={"T3"}, empty={"T7"})
+    result = download_history(provider, tickers, "2024-01-01", chunk_size=5, retries=1,
+                              deadline=10)
+    # The failed chunk and the all-NaN ticker are retried one by one
+    assert result.missing == ["T3", "T7"]
+    assert list(result.close.columns) == ["T0", "T1", "T2", "T4", "T5", "T6", "T8", "T9"]
+    assert result.close.notna().all().all()
+    assert provider.requests.count(("T3",)) == 2 and ("T7",) in provider.requests
+
+
+def test_history_concurrency(monkeypatch):
+    workers = []
+
+    def recording_fetch_all(fn, items, max_workers, **kwargs):
+        workers.append(max_workers)
+        return fetch_all(fn, items, max_workers=max_workers, **kwargs)
+
+    monkeypatch.setattr(history, "fetch_all", recording_fetch_all)
+    download_history(ChunkProvider(concurrency=1), ["A", "B"], "2024-01-01", max_workers=4)
+    download_history(ChunkProvider(), ["A", "B"], "2024-01-01", max_workers=4)
+    assert workers == [1, 4]
+
+
+def test_nothing_downloaded():
+    result = download_history(ChunkProvider(broken={"A", "B"}), ["A", "B"], "2024-01-01",
+                              retries=0)
+    assert result.close.empty and result.missing == ["A", "B"]
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from data import refresh_prices
+from price_store import PriceStore
+from providers import MarketDataProvider
+
+"""
+tests/test_price_store.py
+
+Tests of the on-disk price store: incremental merges, the last-date index
+and refresh requests starting from each ticker's last stored date.
+"""
+
+
+def _close(dates, **columns):
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(dates))
+
+
+def test_incremental_merge(tmp_path):
+    store = PriceStore(tmp_path)
+    assert store.last_dates("equity", ["A"]) == {"A": None}
+    assert store.read("equity", ["A"]).empty
+
+    store.write("equity", _close(["2024-01-01", "2024-01-02", "2024-01-03"],
+                                 A=[1.0, 2.0, 2.5], B=[np.nan, 5.0, 6.0]))
+    # The next refresh starts at the last stored bar, which may have been intraday
+    store.write("equity", _close(["2024-01-03", "2024-01-04"], A=[3.0, 4.0], B=[np.nan, 7.0]))
+
+    assert store.last_dates("equity", ["A", "B", "C"]) == {
+        "A": pd.Timestamp("2024-01-04"), "B": pd.Timestamp("2024-01-04"), "C": None}
+    close = store.read("equity", ["A", "B", "C"])
+    assert list(close.columns) == ["A", "B"]
+    assert close["A"].tolist() == [1.0, 2.0, 3.0, 4.0]
+    # A missing value in the update keeps the stored one
+    assert close["B"].tolist()[1:] == [5.0, 6.0, 7.0] and np.isnan(close["B"].iloc[0])
+
+
+def test_asset_classes_are_separate(tmp_path):
+    store = PriceStore(tmp_path)
+    store.write("crypto", _close(["2024-01-06", "2024-01-07"], X=[1.0, 2.0]))
+    assert store.last_dates("equity", ["X"]) == {"X": None}
+    assert store.last_dates("crypto", ["X"]) == {"X": pd.Timestamp("2024-01-07")}
+
+
+def test_index_without_file(tmp_path):
+    store = PriceStore(tmp_path)
+    store.write("equity", _close(["2024-01-01"], A=[1.0]))
+    store._path("equity", "A").unlink()
+    # A ticker whose file is gone is downloaded again from scratch
+    assert store.last_dates("equity", ["A"]) == {"A": None}
+
+
+def test_corrupted_index(tmp_path):
+    store = PriceStore(tmp_path)
+    store.write("equity", _close(["2024-01-01"], A=[1.0]))
+    store._index_path("equity").write_text("{")
+    assert store.last_dates("equity", ["A"]) == {"A": None}
+    store.write("equity", _close(["2024-01-02"], A=[2.0]))
+    assert store.last_dates("equity", ["A"]) == {"A": pd.Timestamp("2024-01-02")}
+    assert list(tmp_path.glob("**/*.tmp")) == []
+
+
+class RecordingProvider(MarketDataProvider):
+    """Constant prices up to 2024-01-10, recording every history request."""
+
+    def __init__(self):
+        self.requests = []
+
+    def history(self, tickers, start):
+        self.requests.append((sorted(tickers), start))
+        return pd.DataFrame({t: 1.0 for t in tickers}, index=pd.bdate_range(start, "2024-01-10"))
+
+
+def test_refresh_requests_from_last_dates(tmp_path):
+    store = PriceStore(tmp_path)
+    store.write("equity", _close(["2024-01-08"], A=[1.0], B=[1.0]))
+    store.write("equity", _close(["2024-01-02"], STALE=[1.0]))
+    provider = RecordingProvider()
+    close = refresh_prices(provider, store, "equity", ["A", "B", "STALE", "NEW"], "2024-01-01")
+
+    assert provider.requests == [(["NEW"], "2024-01-01"), (["A", "B"], "2024-01-08"),
+                                 (["STALE"], "2024-01-02")]
+    assert sorted(close.columns) == ["A", "B", "NEW", "STALE"]
+    assert close.index[-1] == pd.Timestamp("2024-01-10")
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from returns import ReturnEngine, horizon_label, horizon_start
+
+"""
+tests/test_returns.py
+
+Tests of the calendar-aware return engine: horizons resolve to the last
+close on or before the same calendar date on both the equity and the
+crypto calendar.
+"""
+
+
+@pytest.mark.parametrize("horizon, expected", [
+    ("1d", "2024-03-14"), ("1w", "2024-03-08"), ("1m", "2024-02-15"), ("3m", "2023-12-15"),
+    ("1y", "2023-03-15"), ("3y", "2021-03-15"), ("MTD", "2024-02-29"), ("YTD", "2023-12-31"),
+])
+def test_horizon_start(horizon, expected):
+    assert horizon_start(pd.Timestamp("2024-03-15"), horizon) == pd.Timestamp(expected)
+
+
+def test_horizon_start_unknown():
+    with pytest.raises(ValueError):
+        horizon_start(pd.Timestamp("2024-03-15"), "1q")
+
+
+def test_horizon_label():
+    assert horizon_label("1d") == "1_d"
+    assert horizon_label("YTD") == "ytd"
+
+
+def test_returns_on_both_calendars():
+    # Close = day number since 2023-01-01, so prices identify their date
+    def frame(dates):
+        return pd.DataFrame({"X": (dates - pd.Timestamp("2023-01-01")).days + 1.0}, index=dates)
+
+    equity = frame(pd.bdate_range("2023-01-02", "2024-03-18"))  # ends on a Monday
+    crypto = frame(pd.date_range("2023-01-01", "2024-03-18"))
+    for prices in (equity, crypto):
+        table = ReturnEngine(prices).table(("1d", "1w", "1y", "YTD"))
+        for horizon in ("1w", "1y", "YTD"):
+            # Last close on or before the reference date, whatever the calendar
+            start = horizon_start(prices.index[-1], horizon)
+            expected = prices.loc[:start, "X"].iloc[-1]
+            assert table.loc["X", f"price_{horizon_label(horizon)}"] == expected
+            assert table.loc["X", f"{horizon.lower()}_return"] == pytest.approx(
+                prices["X"].iloc[-1] / expected - 1)
+    # 1d on a Monday: Friday's close for equities, Sunday's for crypto
+    assert ReturnEngine(equity).table(("1d",)).loc["X", "price_1_d"] == equity.loc["2024-03-15", "X"]
+    assert ReturnEngine(crypto).table(("1d",)).loc["X", "price_1_d"] == crypto.loc["2024-03-17", "X"]
+
+
+def test_short_history_and_gaps():
+    dates = pd.bdate_range("2024-01-01", "2024-03-15")
+    prices = pd.DataFrame({"A": np.linspace(10, 20, len(dates)), "B": np.nan}, index=dates)
+    prices.loc[dates[-5]:, "B"] = 5.0
+    prices.loc[dates[-1], "A"] = np.nan  # no bar today: last known close is used
+
+    table = ReturnEngine(prices).table(("1w", "1y"))
+    assert table.loc["A", "price_last"] == prices["A"].iloc[-2]
+    assert np.isnan(table.loc["A", "price_1_y"]) and np.isnan(table.loc["A", "1y_return"])
+    assert np.isnan(table.loc["B", "price_1_w"])  # listed after the reference date
+    assert table.loc["A", "price_ath"] == prices["A"].max()
+    assert table.loc["A", "dist_ath"] == pytest.approx(0)
+
+
+def test_cached_horizons():
+    dates = pd.bdate_range("2023-01-02", "2024-03-15")
+    prices = pd.DataFrame({"A": np.arange(len(dates), dtype=float) + 1}, index=dates)
+    engine = ReturnEngine(prices)
+    first = engine.table(("1w",))
+    both = engine.table(("1w", "1m"))
+    assert set(engine.rows(["1w", "1m"])) == {"1w", "1m"}
+    pd.testing.assert_series_equal(first["1w_return"], both["1w_return"])
+    pd.testing.assert_frame_equal(both, ReturnEngine(prices).table(("1w", "1m")))
+
+
+def test_empty():
+    table = ReturnEngine(pd.DataFrame(columns=["A"], dtype="float64")).table()
+    assert table.index.tolist() == ["A"] and table.isna().all().all()
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from price_matrix import PriceMatrix
+from risk import RiskEngine
+
+"""
+tests/test_risk.py
+
+Tests of the risk analytics: incremental updates must match a full
+recompute of the same prices.
+"""
+
+
+def _walk(rng, dates, columns):
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), len(columns))), axis=0))
+    return pd.DataFrame(values, index=dates, columns=columns)
+
+
+def _prices(equity, crypto):
+    return PriceMatrix.from_frames({"equity": equity, "crypto": crypto})
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(3)
+    equity = _walk(rng, pd.bdate_range("2023-01-02", "2024-06-04"), ["SPY", "QQQ", "AAA", "BBB"])
+    equity.iloc[:-30, 3] = np.nan  # listed during the window
+    crypto = _walk(rng, pd.date_range("2023-01-01", "2024-06-04"), ["BTC-USD", "ETH-USD"])
+    return equity, crypto
+
+
+def _assert_matches_full(engine, prices):
+    expected_metrics, expected_correlation = RiskEngine(window=60).update(prices)
+    pd.testing.assert_frame_equal(engine.metrics(prices), expected_metrics, rtol=1e-6)
+    pd.testing.assert_frame_equal(engine.correlation(), expected_correlation, rtol=1e-4)
+
+
+@pytest.mark.parametrize("change", ["revise", "append"])
+def test_incremental_matches_full(frames, change):
+    equity, crypto = frames
+    engine = RiskEngine(window=60)
+    engine.update(_prices(equity.iloc[:-1], crypto.iloc[:-1]))
+    if change == "revise":
+        equity.iloc[-2] *= 1.05
+        crypto.iloc[-2] *= 0.9
+        prices = _prices(equity.iloc[:-1], crypto.iloc[:-1])
+    else:
+        prices = _prices(equity, crypto)
+
+    assert engine._incremental(prices)
+    _assert_matches_full(engine, prices)
+
+
+@pytest.mark.parametrize("change", ["revise", "append"])
+def test_incremental_with_universe_changes(frames, change):
+    equity, crypto = frames
+    engine = RiskEngine(window=60)
+    engine.update(_prices(equity.iloc[:-1, :3], crypto.iloc[:-1]))
+    # BBB enters (listed during the window), AAA and ETH-USD leave
+    equity, crypto = equity[["SPY", "BBB", "QQQ"]], crypto[["BTC-USD"]]
+    if change == "revise":
+        prices = _prices(equity.iloc[:-1], crypto.iloc[:-1])
+    else:
+        prices = _prices(equity, crypto)
+
+    assert engine._incremental(prices)
+    assert engine.metrics(prices).index.tolist() == ["SPY", "BBB", "QQQ", "BTC-USD"]
+    _assert_matches_full(engine, prices)
+
+
+def test_restore(frames, tmp_path):
+    equity, crypto = frames
+    engine = RiskEngine(window=60)
+    engine.update(_prices(equity.iloc[:-1], crypto.iloc[:-1]))
+    saved = engine.copy()
+    engine.update(_prices(equity.iloc[:-1] * 2, crypto.iloc[:-1]))  # does not affect the copy
+    saved.save(tmp_path)
+
+    restored = RiskEngine(window=60)
+    assert restored.restore(tmp_path)
+    assert not RiskEngine(window=20).restore(tmp_path)
+    prices = _prices(equity, crypto)
+    assert restored._incremental(prices)
+    _assert_matches_full(restored, prices)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from screener import (And, ColumnIndex, IsIn, Not, Or, Range, Screen, ScreenError,
+                      Screener, _tokenize, get_screener, parse)
+
+"""
+tests/test_screener.py
+
+Tests of the screening engine: query tokenizer and parser, column indexes
+and screener results, checked against the equivalent pandas filters. Run
+from the repository root:
+
+    python -m pytest tests
+"""
+
+
+@pytest.fixture
+def summary():
+    rng = np.random.default_rng(0)
+    n = 200
+    frame = pd.DataFrame({
+        "marketCap(Bn)": rng.lognormal(3, 1.5, n),
+        "1y_return": rng.normal(0.1, 0.3, n),
+        "dist_ath": -rng.uniform(0, 0.8, n),
+        "Sector": rng.choice(["Technology", "Consumer Cyclical", "etf"], n),
+    }, index=[f"T{i:03d}" for i in range(n)])
+    frame.loc[frame.index[::17], "1y_return"] = np.nan
+    return frame
+
+
+def test_tokenize():
+    tokens = _tokenize("`marketCap(Bn)` >= 1e2 and Sector in ('a b', c) top 5 by 1y_return")
+    assert tokens == [("word", "marketCap(Bn)"), ("op", ">="), ("number", 100.0),
+                      ("word", "and"), ("word", "Sector"), ("word", "in"), ("op", "("),
+                      ("string", "a b"), ("op", ","), ("word", "c"), ("op", ")"),
+                      ("word", "top"), ("number", 5.0), ("word", "by"), ("word", "1y_return")]
+    assert _tokenize("dist_ath < -20%") == [("word", "dist_ath"), ("op", "<"), ("number", -0.2)]
+
+
+def test_parse():
+    assert parse("a > 1 or b <= 2 and not c = x") == Screen(Or((
+        Range("a", low=1, include_low=False),
+        And((Range("b", high=2), Not(IsIn("c", ("x",))))),
+    )))
+    assert parse("a between 10% and 50%") == Screen(Range("a", 0.1, 0.5))
+    assert parse("s not in (x, \"y z\")") == Screen(Not(IsIn("s", ("x", "y z"))))
+    assert parse("a != 3 top 2 by b") == Screen(Not(Range("a", 3, 3)), ("b", 2, True))
+    assert parse("BOTTOM 3 BY b") == Screen(None, ("b", 3, False))
+
+
+@pytest.mark.parametrize("query", ["a >", "a between 1 or 2", "a < x", "(a > 1", "a > 1 b",
+                                   "top 3 b", "a not > 1", "a ? 1"])
+def test_parse_errors(query):
+    with pytest.raises(ScreenError):
+        parse(query)
+
+
+def test_column_index():
+    rng = np.random.default_rng(1)
+    values = np.round(rng.normal(size=500), 1)
+    values[::7] = np.nan
+    index = ColumnIndex(values)
+    for low, high, include_low, include_high in [(-0.5, 0.5, True, True), (-0.5, 0.5, False, False),
+                                                 (0.3, 0.3, True, True), (1, -1, True, True),
+                                                 (-np.inf, 0.0, True, False)]:
+        above = values >= low if include_low else values > low
+        below = values <= high if include_high else values < high
+        expected = np.flatnonzero(above & below)
+        assert np.array_equal(np.sort(index.range(low, high, include_low, include_high)),
+                              expected)
+
+    mask = rng.random(500) < 0.5
+    candidates = pd.Series(values)[mask & ~np.isnan(values)]
+    assert np.array_equal(values[index.top(10, mask)],
+                          candidates.nlargest(10).to_numpy())
+    assert np.array_equal(values[index.top(10, mask, largest=False)],
+                          candidates.nsmallest(10).to_numpy())
+
+
+def test_screener_matches_pandas(summary):
+    screener = Screener(summary)
+    result = screener.run("`marketCap(Bn)` >= 20 and Sector in (technology, \"Consumer Cyclical\")"
+                          " or not dist_ath < -20%")
+    expected = summary[(summary["marketCap(Bn)"] >= 20)
+                       & summary["Sector"].isin(["Technology", "Consumer Cyclical"])
+                       | ~(summary["dist_ath"] < -0.2)]
+    assert result.index.equals(expected.index)
+
+    result = screener.run("Sector != etf top 20 by 1y_return")
+    expected = summary[summary["Sector"] != "etf"]["1y_return"].nlargest(20)
+    assert result.index.equals(expected.index)
+
+    result = screener.run("bottom 5 by 1y_return")
+    assert result.index.equals(summary["1y_return"].nsmallest(5).index)
+
+    with pytest.raises(ScreenError):
+        screener.run("unknown > 1")
+    with pytest.raises(ScreenError):
+        screener.run("Sector > 1")
+
+
+def test_get_screener(summary):
+    assert get_screener(summary, "v1") is get_screener(summary.iloc[:0], "v1")
+    # Without a version nothing is cached, so a new summary is never served stale results
+    assert len(get_screener(summary, None).run("bottom 5 by 1y_return")) == 5
+    assert len(get_screener(summary.iloc[:3], None).run("bottom 5 by 1y_return")) <= 3